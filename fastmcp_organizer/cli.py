@@ -3,16 +3,26 @@ import os
 os.environ.setdefault("OTEL_SERVICE_NAME", "fastmcp-organizer")
 
 import click
-from pathlib import Path
 from rich.console import Console
-from rich.table import Table
-from rich.panel import Panel
-from fastmcp_organizer.server.context import Context
-from fastmcp_organizer.server.mcp_agent import mcp
+from fastmcp_organizer.server.context import get_service
 from fastmcp_organizer.utils.observability import Observability
 
 console = Console()
 
+STATUS_COLORS = {"DONE": "green", "PENDING": "yellow"}
+
+# C-implemented path helpers; avoid building Path objects per item
+_basename = os.path.basename
+_dirname = os.path.dirname
+
+def _category_of(dest_path: str) -> str:
+    """Name of the destination folder (Path(dest_path).parent.name)."""
+    return _basename(_dirname(dest_path))
+
+def _status_markup(status: str) -> str:
+    color = STATUS_COLORS.get(status, "red")
+    return f"[{color}]{status}[/{color}]"
+
 @click.group()
 def cli():
     pass
@@ -20,14 +30,16 @@ def cli():
 @cli.command()
 def server():
     """Starts the MCP Server"""
+    from fastmcp_organizer.server.mcp_agent import mcp # fastmcp is heavy; only needed here
     console.print("[bold green]Starting MCP Server...[/bold green]")
     mcp.run()
 
 @cli.command()
 @click.argument('path')
-def scan(path):
+@click.option('--flush', is_flag=True, help="Flush traces to Langfuse before returning (e.g. in CI)")
+def scan(path, flush):
     """Scans and generates a plan for a directory"""
-    service = Context.get_service()
+    service = get_service()
     try:
         with Observability.trace("CLI Scan", metadata={"path": path}):
             with console.status("[bold blue]Scanning directory..."):
@@ -36,14 +48,19 @@ def scan(path):
     except Exception as e:
         console.print(f"[bold red]Error:[/bold red] {e}")
     finally:
-        Observability.flush()
+        # Otherwise flushed at process exit
+        if flush:
+            Observability.flush()
 
 @cli.command()
 @click.argument('plan_id')
 def show(plan_id):
     """Shows details of a plan"""
-    service = Context.get_service()
-    plan = service.get_plan(plan_id)
+    from rich.table import Table
+    from rich.panel import Panel
+
+    service = get_service()
+    plan = service.get_plan(plan_id, include_items=False)
     if not plan:
         console.print(f"[bold red]Plan {plan_id} not found[/bold red]")
         return
@@ -59,14 +76,18 @@ def show(plan_id):
     table.add_column("Destination", style="green")
     table.add_column("Reasoning", style="dim")
 
-    for item in plan.items:
-        status_color = "green" if item.status == "DONE" else "yellow" if item.status == "PENDING" else "red"
-        table.add_row(
-            f"[{status_color}]{item.status}[/{status_color}]",
-            Path(item.src_path).name,
-            Path(item.dest_path).parent.name,
+    # Plain string ops instead of Path objects; this runs once per item
+    rows = (
+        (
+            _status_markup(item.status),
+            _basename(item.src_path),
+            _category_of(item.dest_path),
             item.reasoning
         )
+        for item in service.iter_plan_items(plan_id)
+    )
+    for row in rows:
+        table.add_row(*row)
 
     console.print(table)
 
@@ -74,7 +95,7 @@ def show(plan_id):
 @click.argument('plan_id')
 def execute(plan_id):
     """Executes a plan by ID"""
-    service = Context.get_service()
+    service = get_service()
     try:
         with console.status("[bold blue]Executing plan..."):
             results = service.execute_plan(plan_id)
@@ -86,10 +107,12 @@ def execute(plan_id):
                 console.print(f"[green]{res}[/green]")
     except Exception as e:
          console.print(f"[bold red]Error:[/bold red] {e}")
+
+@cli.command()
 @click.argument('plan_id')
 def feedback(plan_id):
     """Provide feedback for a plan to improve AI"""
-    service = Context.get_service()
+    service = get_service()
     plan = service.get_plan(plan_id)
     if not plan:
         console.print(f"[bold red]Plan {plan_id} not found[/bold red]")
@@ -104,7 +127,9 @@ def feedback(plan_id):
     console.print("Rate each item (1=Good, 0=Bad). Press Enter to skip.")
     
     for item in plan.items:
-        console.print(f"\nFile: [cyan]{Path(item.src_path).name}[/cyan] -> [green]{Path(item.dest_path).parent.name}[/green]")
+        file_name = _basename(item.src_path)
+        category = _category_of(item.dest_path)
+        console.print(f"\nFile: [cyan]{file_name}[/cyan] -> [green]{category}[/green]")
         console.print(f"Reasoning: {item.reasoning}")
         
         score_input = click.prompt("Score (1/0)", default="", show_default=False)
@@ -127,8 +152,8 @@ def feedback(plan_id):
             id=f"score-{item.id}", # stable key
             metadata={
                 "plan_id": plan_id,
-                "file": Path(item.src_path).name,
-                "category": Path(item.dest_path).parent.name
+                "file": file_name,
+                "category": category
             }
         )
         console.print("[green]Feedback Sent![/green]")
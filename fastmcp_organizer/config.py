@@ -12,6 +12,14 @@ class Config:
     LLM_PROVIDER = os.getenv("LLM_PROVIDER", "openai").lower() # openai or ollama
     OLLAMA_BASE_URL = os.getenv("OLLAMA_BASE_URL", "http://localhost:11434/v1")
     
+    # LLM Batching
+    LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "8"))
+    LLM_USE_BATCH_API = os.getenv("LLM_USE_BATCH_API", "false").lower() == "true" # OpenAI Batch API (offline, cheaper)
+    LLM_BATCH_POLL_SECONDS = float(os.getenv("LLM_BATCH_POLL_SECONDS", "10"))
+    LLM_BATCH_MAX_WAIT_SECONDS = float(os.getenv("LLM_BATCH_MAX_WAIT_SECONDS", "1800")) # Then cancel and classify online
+    LLM_SKIP_THRESHOLD = float(os.getenv("LLM_SKIP_THRESHOLD", "0.85")) # Heuristic confidence at which the LLM is not consulted
+    LLM_FILES_PER_PROMPT = int(os.getenv("LLM_FILES_PER_PROMPT", "1")) # Files packed into one chat request (max 50)
+    
     # Observability
     LANGFUSE_PUBLIC_KEY = os.getenv("LANGFUSE_PUBLIC_KEY")
     LANGFUSE_SECRET_KEY = os.getenv("LANGFUSE_SECRET_KEY")
@@ -21,3 +29,6 @@ class Config:
     os.environ.setdefault("OTEL_SERVICE_NAME", "fastmcp-organizer")
     
     ALLOW_SYMLINKS = os.getenv("ALLOW_SYMLINKS", "false").lower() == "true"
+    
+    # Scanner threads (stat + sample read + hash per file)
+    SCAN_WORKERS = int(os.getenv("SCAN_WORKERS", str(min(32, (os.cpu_count() or 1) * 4))))
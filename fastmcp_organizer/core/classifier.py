@@ -1,35 +1,193 @@
-import xml.etree.ElementTree as ET
 import os
-from typing import Optional
+import re
+import json
+import time
+import asyncio
+import hashlib
+import logging
+import itertools
+import tempfile
+import importlib.util
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Optional, List, Dict, IO, TYPE_CHECKING
 from pathlib import Path
 from pydantic import BaseModel
-from openai import OpenAI
 
-from fastmcp_organizer.core.interfaces import IClassifier, FileMetadata, ClassificationResult
+# openai/httpx are imported lazily (only once an LLM client is built) to keep CLI startup fast
+if TYPE_CHECKING:
+    from openai import OpenAI, AsyncOpenAI
+
+from fastmcp_organizer.core.interfaces import IClassifier, ClassificationBatch, FileMetadata, ClassificationResult
 from fastmcp_organizer.config import Config
 from fastmcp_organizer.utils.observability import Observability
 
+# Case-insensitive search over the raw sample bytes: no decode, no lowered copy
+_FINANCIAL_RE = re.compile(rb'invoice|total', re.IGNORECASE)
+
+# extension -> (category, confidence, requires_deep_scan); one dict probe per file
+_DEFAULT_EXT_RULE = ("Misc", 0.5, False)
+_EXT_RULES = {
+    "pdf": ("Misc", 0.5, True),
+    "docx": ("Misc", 0.5, True),
+    "jpg": ("Images", 0.9, False),
+    "png": ("Images", 0.9, False),
+    "jpeg": ("Images", 0.9, False),
+}
+_GENERIC_CATEGORIES = frozenset({"Misc", "Other"})
+
+def _filename_of(path: str) -> str:
+    """Basename of a path string, without building a PurePath."""
+    return os.path.basename(path)
+
+# Shared HTTP connection pool: keep-alive (and HTTP/2 when h2 is installed) across classifications
+HTTP_MAX_KEEPALIVE_CONNECTIONS = 20
+HTTP_MAX_CONNECTIONS = 40
+HTTP2_AVAILABLE = importlib.util.find_spec("h2") is not None
+
+def _client_settings() -> Optional[dict]:
+    """OpenAI client kwargs for the configured provider, or None if no LLM is configured."""
+    if Config.LLM_PROVIDER == "ollama":
+        return {"base_url": Config.OLLAMA_BASE_URL, "api_key": "ollama"} # Dummy key
+    if Config.OPENAI_API_KEY:
+        return {"api_key": Config.OPENAI_API_KEY}
+    return None
+
+def _http_limits():
+    import httpx
+    return httpx.Limits(max_keepalive_connections=HTTP_MAX_KEEPALIVE_CONNECTIONS, max_connections=HTTP_MAX_CONNECTIONS)
+
+@lru_cache(maxsize=1)
+def _shared_openai_client() -> Optional["OpenAI"]:
+    """Process-wide sync client, so every classifier instance reuses the same connections."""
+    settings = _client_settings()
+    if settings is None:
+        return None
+    import httpx
+    from openai import OpenAI
+    return OpenAI(http_client=httpx.Client(limits=_http_limits(), http2=HTTP2_AVAILABLE), **settings)
+
+def _new_async_openai_client() -> "AsyncOpenAI":
+    """
+    Async client for a single batch. httpx async pools are bound to the event loop
+    they were opened on, and each batch runs on its own loop.
+    """
+    import httpx
+    from openai import AsyncOpenAI
+    return AsyncOpenAI(http_client=httpx.AsyncClient(limits=_http_limits(), http2=HTTP2_AVAILABLE), **_client_settings())
+
+class LLMClassificationResponse(BaseModel):
+    """Shape of the LLM's JSON answer (mirrors the POML output-schema)."""
+    category: str = "Misc"
+    confidence_score: float = 0.5
+    requires_deep_scan: bool = False
+    reasoning_summary: Optional[str] = None
+
+class LLMClassificationBatchItem(LLMClassificationResponse):
+    index: int
+
+class LLMClassificationBatchResponse(BaseModel):
+    """Answer to a packed prompt: one entry per file, matched back by index."""
+    results: List[LLMClassificationBatchItem] = []
+
+# Appended to the system prompt (in place of the single-file schema) when several files share one request
+PACKED_PROMPT_SUFFIX = (
+    "\n\nYou will be given several files, each under a '### File <index>' heading. "
+    'Classify every file and respond with one JSON object {"results": [...]} holding one result per file, '
+    'each including that file\'s "index".'
+)
+
+def _packed_schema(single: dict) -> dict:
+    """Wraps a single-file json_schema payload into {"results": [{index, ...fields}]}."""
+    item = dict(single.get("schema", {}))
+    item["properties"] = {"index": {"type": "integer"}, **item.get("properties", {})}
+    item["required"] = ["index", *item.get("required", [])]
+    return {**single, "name": f"{single.get('name', 'Result')}Batch", "schema": {
+        "type": "object",
+        "additionalProperties": False,
+        "properties": {"results": {"type": "array", "items": item}},
+        "required": ["results"]
+    }}
+
+POML_PATH = Path(__file__).parent.parent / "prompts" / "classifier.poml"
+# Written at build time by fastmcp_organizer.tools.compile_prompts
+COMPILED_PROMPTS_PATH = Path(__file__).parent.parent / "prompts_compiled.py"
+
+@dataclass(frozen=True)
+class POMLTemplate:
+    system: str
+    user: str
+    schema: Optional[dict] = None
+    schema_prompt: str = "" # Pre-serialized schema suffix for the system prompt
+
+DEFAULT_POML = POMLTemplate(system="You are a helpful assistant.", user="Analyze {{filename}}")
+
+def _load_poml(poml_path: Path) -> POMLTemplate:
+    """
+    Returns the parsed POML template.
+    Cached per (path, mtime) so edits to the prompt file are still picked up.
+    """
+    try:
+        mtime_ns = poml_path.stat().st_mtime_ns
+    except OSError:
+        return DEFAULT_POML
+    if poml_path == POML_PATH:
+        compiled = _compiled_poml(mtime_ns)
+        if compiled:
+            return compiled
+    return _parse_poml(str(poml_path), mtime_ns)
+
+def _poml_digest(data: bytes) -> str:
+    """Content hash that ties a compiled prompt to its POML source (mtimes change on checkout/install)."""
+    return hashlib.sha256(data).hexdigest()
+
+@lru_cache(maxsize=4)
+def _compiled_poml(mtime_ns: int) -> Optional[POMLTemplate]:
+    """
+    Build-time compiled prompt, if present and generated from this version of the POML file.
+    Cached per mtime, so the source is only read and hashed again after it changes.
+    """
+    try:
+        from fastmcp_organizer import prompts_compiled as pc
+    except ImportError:
+        return None
+    try:
+        digest = _poml_digest(POML_PATH.read_bytes())
+    except OSError:
+        return None
+    if getattr(pc, "SOURCE_SHA256", None) != digest:
+        return None # Stale; POML edited since compile
+    return POMLTemplate(system=pc.SYSTEM, user=pc.USER, schema=pc.SCHEMA, schema_prompt=pc.SCHEMA_PROMPT)
+
+@lru_cache(maxsize=4)
+def _parse_poml(path: str, mtime_ns: int) -> POMLTemplate:
+    system, user, schema, schema_prompt = DEFAULT_POML.system, DEFAULT_POML.user, None, ""
+    try:
+        import xml.etree.ElementTree as ET
+        root = ET.parse(path).getroot()
+        system = root.find("system-msg").text.strip()
+        user = root.find("human-msg").text.strip()
+        schema_text = root.find("output-schema").text.strip()
+        if schema_text:
+            schema = json.loads(schema_text)
+            # Inject schema into system prompt (Crucial for Ollama/Models without native struct output)
+            schema_prompt = f"\n\nJSON Schema:\n{json.dumps(schema, indent=2)}"
+    except Exception as e:
+        logging.warning("Failed to load POML: %s", e)
+    return POMLTemplate(system=system, user=user, schema=schema, schema_prompt=schema_prompt)
+
 class HeuristicClassifier(IClassifier):
-    def classify(self, metadata: FileMetadata, content_sample: Optional[str] = None) -> ClassificationResult:
-        file_path = Path(metadata.path)
-        name = file_path.name.lower()
-        
-        category = "Misc"
-        confidence = 0.5
-        requires_deep_scan = False
+    def classify(self, metadata: FileMetadata, content_sample: Optional[bytes] = None) -> ClassificationResult:
+        name = _filename_of(metadata.path).lower()
 
         # 1. Extension Heuristics
-        if name.endswith(('.pdf', '.docx')):
-            requires_deep_scan = True
-            
-        if name.endswith(('.jpg', '.png', '.jpeg')):
-            category = "Images"
-            confidence = 0.9
+        _, dot, ext = name.rpartition('.')
+        category, confidence, requires_deep_scan = _EXT_RULES.get(ext, _DEFAULT_EXT_RULE) if dot else _DEFAULT_EXT_RULE
 
         # 2. Content Heuristics (Tier 1)
         if content_sample:
-            lower_content = content_sample.lower()
-            if "invoice" in lower_content or "total" in lower_content:
+            if _FINANCIAL_RE.search(content_sample):
                 category = "Financial"
                 confidence = 0.85
                 requires_deep_scan = True # Verification needed maybe
@@ -48,7 +206,7 @@ class HeuristicClassifier(IClassifier):
         score = base_score
         
         # Penalty: Generic categories
-        if category in ["Misc", "Other"]:
+        if category in _GENERIC_CATEGORIES:
             score -= 0.2
             
         # Boost: Filename corroboration
@@ -58,72 +216,92 @@ class HeuristicClassifier(IClassifier):
         return min(max(score, 0.0), 1.0)
 
 
+_UNSET = object()
+
 class LLMClassifier(IClassifier):
     def __init__(self, fallback_classifier: IClassifier):
         self.fallback = fallback_classifier
-        self.client = None
-        
-        if Config.LLM_PROVIDER == "ollama":
-            self.client = OpenAI(
-                base_url=Config.OLLAMA_BASE_URL,
-                api_key="ollama" # Dummy key
-            )
-        elif Config.OPENAI_API_KEY:
-             self.client = OpenAI(api_key=Config.OPENAI_API_KEY)
+        self._client = _UNSET
 
-    def classify(self, metadata: FileMetadata, content_sample: Optional[str] = None) -> ClassificationResult:
+    @property
+    def client(self) -> Optional["OpenAI"]:
+        """
+        Shared OpenAI client (None without an LLM), built on first use: services built for
+        show/execute never classify, so they don't pay for importing openai/httpx.
+        """
+        if self._client is _UNSET:
+            self._client = _shared_openai_client()
+        return self._client
+
+    @client.setter
+    def client(self, value: Optional["OpenAI"]) -> None:
+        self._client = value
+
+    def classify(self, metadata: FileMetadata, content_sample: Optional[bytes] = None) -> ClassificationResult:
         # 1. Run Heuristic First
         heuristic_result = self.fallback.classify(metadata, content_sample)
         
-        # 2. Use LLM if available (Mandatory - No heuristic short-circuit)
+        # 2. Use LLM if available
         if not self.client:
             return heuristic_result
-            
-        try:
-            print(f"[INFO] calling LLM for: {metadata.path}")
-            return self._call_llm(metadata, content_sample, heuristic_result)
-        except Exception as e:
-            Observability.track_event("LLM_Error", {"error": str(e)})
+
+        # 3. Skip the LLM when the heuristic is already confident
+        if self._heuristic_is_final(heuristic_result):
+            Observability.track_event("LLM_Skipped", {"path": metadata.path, "category": heuristic_result.category})
             return heuristic_result
 
-    def _call_llm(self, metadata: FileMetadata, content_sample: Optional[str], heuristic_res: ClassificationResult) -> ClassificationResult:
+        return self._classify_with_llm(metadata, content_sample, heuristic_result)
 
-        
-        filename = Path(metadata.path).name
-        sample = content_sample or "N/A"
-        
-        # 1. Load POML (File-based)
-        poml_path = Path(__file__).parent.parent / "prompts" / "classifier.poml"
-        poml_system = "You are a helpful assistant."
-        poml_user = "Analyze {{filename}}"
-        poml_schema = None
-        
+    @staticmethod
+    def _heuristic_is_final(heuristic_res: ClassificationResult) -> bool:
+        return heuristic_res.confidence_score >= Config.LLM_SKIP_THRESHOLD and not heuristic_res.requires_deep_scan
+
+    def _classify_with_llm(self, metadata: FileMetadata, content_sample: Optional[bytes], heuristic_res: ClassificationResult) -> ClassificationResult:
         try:
-            if poml_path.exists():
-                tree = ET.parse(poml_path)
-                root = tree.getroot()
-                poml_system = root.find("system-msg").text.strip()
-                poml_user = root.find("human-msg").text.strip()
-                schema_text = root.find("output-schema").text.strip()
-                if schema_text:
-                    import json
-                    poml_schema = json.loads(schema_text)
+            logging.info("calling LLM for: %s", metadata.path)
+            return self._call_llm(metadata, content_sample, heuristic_res)
         except Exception as e:
-            print(f"[WARN] Failed to load POML: {e}")
+            Observability.track_event("LLM_Error", {"error": str(e)})
+            return heuristic_res
+
+    def _call_llm(self, metadata: FileMetadata, content_sample: Optional[bytes], heuristic_res: ClassificationResult) -> ClassificationResult:
+        messages, resp_fmt, lf_prompt, current_source = self._build_request(metadata, content_sample, heuristic_res)
 
-        # 2. Determine Source (Langfuse > POML)
-        langfuse = Observability.get_client()
-        lf_prompt = None
-        current_source = "poml"
+        with Observability.generation(
+            name="OpenAI Classification",
+            model=Config.MODEL_NAME,
+            input=messages,
+            prompt=lf_prompt, # None if POML
+            metadata={"prompt_source": current_source}
+        ) as gen:
+            response = self.client.chat.completions.create(
+                model=Config.MODEL_NAME,
+                messages=messages,
+                response_format=resp_fmt
+            )
+            
+            content = response.choices[0].message.content
+            gen.update(output=content)
+
+        return self._parse_content(metadata, content)
+
+    def _build_request(self, metadata: FileMetadata, content_sample: Optional[bytes], heuristic_res: ClassificationResult):
+        """
+        Builds the chat messages and response format for a single file.
+        Returns (messages, response_format, langfuse_prompt, prompt_source).
+        """
+        filename = _filename_of(metadata.path)
+        # Only samples that actually reach the LLM are decoded
+        sample = content_sample.decode('utf-8', errors='ignore') if content_sample else "N/A"
         
-        if langfuse:
-            try:
-                lf_prompt = langfuse.get_prompt("file_classifier")
-                current_source = "langfuse"
-            except:
-                pass # Stick to POML
+        # POML (File-based) is only loaded when actually needed below
+        tpl = None
 
-        # 3. Construct Messages
+        # 1. Determine Source (Langfuse > POML)
+        lf_prompt = Observability.get_prompt("file_classifier") # TTL-cached by the Langfuse SDK
+        current_source = "langfuse" if lf_prompt else "poml"
+
+        # 2. Construct Messages
         messages = []
         if current_source == "langfuse" and lf_prompt:
              try:
@@ -133,25 +311,21 @@ class LLMClassifier(IClassifier):
                 elif isinstance(compiled, list):
                     messages = compiled
              except Exception as e:
-                print(f"[WARN] Prompt compile error: {e}")
+                logging.warning("Prompt compile error: %s", e)
                 current_source = "poml_fallback" # Logic fallback
         
         if not messages: # POML or Fallback
-            # Inject schema into system prompt if available (Crucial for Ollama/Models without native struct output)
-            schema_str = ""
-            if poml_schema:
-                import json
-                schema_str = f"\n\nJSON Schema:\n{json.dumps(poml_schema, indent=2)}"
-            
-            user_msg = poml_user.replace("{{filename}}", filename)\
+            tpl = _load_poml(POML_PATH)
+            # Schema suffix is pre-serialized by _parse_poml
+            user_msg = tpl.user.replace("{{filename}}", filename)\
                                 .replace("{{sample}}", sample)\
                                 .replace("{{heuristic_category}}", heuristic_res.category)
             messages = [
-                {"role": "system", "content": poml_system + schema_str},
+                {"role": "system", "content": tpl.system + tpl.schema_prompt},
                 {"role": "user", "content": user_msg}
             ]
 
-        # 4. Prepare Response Format
+        # 3. Prepare Response Format
         # If POML has strict schema, we can use it. 
         # OpenAI/Ollama support varies. We'll use json_object for safest compat, 
         # or try json_schema if configured.
@@ -159,36 +333,368 @@ class LLMClassifier(IClassifier):
         # BUT user requested schema usage.
         
         resp_fmt = {"type": "json_object"}
-        if poml_schema and Config.LLM_PROVIDER == "openai":
+        if Config.LLM_PROVIDER == "openai":
+            tpl = tpl or _load_poml(POML_PATH) # Langfuse path still takes the strict schema from POML
+        if tpl and tpl.schema and Config.LLM_PROVIDER == "openai":
              # Strict Structured Output for OpenAI (requires method adjustment usually, passing response_format=schema)
              # But standard library expects {"type": "json_schema", "json_schema": ...}
              resp_fmt = {
                  "type": "json_schema",
-                 "json_schema": poml_schema
+                 "json_schema": tpl.schema
              }
 
+        return messages, resp_fmt, lf_prompt, current_source
+
+    @staticmethod
+    def _parse_content(metadata: FileMetadata, content: str) -> ClassificationResult:
+        # JSON parse + validation in one pass (pydantic-core), no intermediate dict
+        return LLMClassifier._to_result(metadata, LLMClassificationResponse.model_validate_json(content))
+
+    @staticmethod
+    def _to_result(metadata: FileMetadata, data: LLMClassificationResponse) -> ClassificationResult:
+        return ClassificationResult(
+            category=data.category,
+            confidence_score=data.confidence_score,
+            requires_deep_scan=data.requires_deep_scan,
+            path=metadata.path,
+            reasoning=data.reasoning_summary
+        )
+
+
+class BatchDeadlineExceeded(TimeoutError):
+    """A Batch API job did not finish within LLM_BATCH_MAX_WAIT_SECONDS and was cancelled."""
+
+class BatchingLLMClassifier(LLMClassifier):
+    """
+    LLM classifier that amortizes network round-trips across many files.
+    Online plans fan out concurrent requests over AsyncOpenAI (bounded by a semaphore);
+    offline plans can go through the OpenAI Batch API instead.
+    """
+
+    BATCH_ENDPOINT = "/v1/chat/completions"
+    BATCH_TERMINAL_STATES = ("completed", "failed", "expired", "cancelled")
+
+    MAX_FILES_PER_PROMPT = 50
+    REPLAY_CHUNK_SIZE = 512 # Spooled Batch API requests re-sent online per round after a timeout
+
+    def __init__(self, fallback_classifier: IClassifier, max_concurrency: int = Config.LLM_MAX_CONCURRENCY, use_batch_api: bool = Config.LLM_USE_BATCH_API, files_per_prompt: int = Config.LLM_FILES_PER_PROMPT):
+        super().__init__(fallback_classifier)
+        self.max_concurrency = max_concurrency
+        self.use_batch_api = use_batch_api
+        # Files packed into one chat request (1 = one request per file)
+        self.files_per_prompt = min(max(files_per_prompt, 1), self.MAX_FILES_PER_PROMPT)
+        # One pooled AsyncOpenAI client per batch (see _new_async_openai_client)
+        self.async_client_factory = _new_async_openai_client if _client_settings() else None
+
+    def classify_many(self, metadatas: List[FileMetadata], samples: List[Optional[bytes]]) -> List[ClassificationResult]:
+        if self._uses_batch_api():
+            job = _BatchAPIJob(self)
+            job.add(metadatas, samples)
+            return job.results()
+
+        # 1. Run Heuristics First (they double as per-file fallbacks)
+        heuristic_results = [self.fallback.classify(m, s) for m, s in zip(metadatas, samples)]
+
+        if not metadatas or not self.client:
+            return heuristic_results
+
+        # 2. Only send files the heuristic isn't confident about
+        pending = [i for i, h in enumerate(heuristic_results) if not self._heuristic_is_final(h)]
+        skipped = len(metadatas) - len(pending)
+        if skipped:
+            Observability.track_event("LLM_Skipped", {"count": skipped, "total": len(metadatas)})
+        if not pending:
+            return heuristic_results
+
+        llm_metadatas = [metadatas[i] for i in pending]
+        llm_samples = [samples[i] for i in pending]
+        llm_heuristics = [heuristic_results[i] for i in pending]
+
+        # async_client_factory is set whenever self.client is (same _client_settings), so the
+        # online path is always async here
+        llm_results = self._run(self._classify_async(llm_metadatas, llm_samples, llm_heuristics))
+
+        results = list(heuristic_results)
+        for i, result in zip(pending, llm_results):
+            results[i] = result
+        return results
+
+    def open_batch(self) -> ClassificationBatch:
+        # With the Batch API, chunks are spooled and sent as a single job; otherwise each chunk
+        # is classified online as it is added
+        if self._uses_batch_api():
+            return _BatchAPIJob(self)
+        return super().open_batch()
+
+    def _uses_batch_api(self) -> bool:
+        # Batch API is OpenAI-only; Ollama always goes through the online path
+        return self.use_batch_api and Config.LLM_PROVIDER == "openai" and bool(self.client)
+
+    @staticmethod
+    def _run(coro):
+        """Runs a coroutine to completion, even when called from inside a running event loop (MCP server)."""
+        try:
+            asyncio.get_running_loop()
+        except RuntimeError:
+            return asyncio.run(coro)
+        with ThreadPoolExecutor(max_workers=1) as ex:
+            return ex.submit(asyncio.run, coro).result()
+
+    def _groups(self, metadatas: List[FileMetadata], samples: List[Optional[bytes]], heuristic_results: List[ClassificationResult]):
+        """Splits the inputs into (metadatas, samples, heuristics) chunks of files_per_prompt, in order."""
+        n = self.files_per_prompt
+        return [
+            (metadatas[i:i + n], samples[i:i + n], heuristic_results[i:i + n])
+            for i in range(0, len(metadatas), n)
+        ]
+
+    def _build_packed_request(self, metadatas: List[FileMetadata], samples: List[Optional[bytes]], heuristic_results: List[ClassificationResult]):
+        """
+        One request for several files: each file's usual user message goes under a numbered heading,
+        and the response schema becomes a list of per-file results. The system prompt carries only
+        the packed schema, so json_object providers (Ollama) get a single format to follow.
+        """
+        blocks = []
+        for i, (metadata, sample, heuristic_res) in enumerate(zip(metadatas, samples, heuristic_results)):
+            messages, resp_fmt, lf_prompt, current_source = self._build_request(metadata, sample, heuristic_res)
+            blocks.append(f"### File {i}\n{messages[-1]['content']}")
+        system = messages[0]["content"] if len(messages) > 1 else ""
+
+        tpl = _load_poml(POML_PATH)
+        packed_schema = _packed_schema(tpl.schema) if tpl.schema else None
+        schema_prompt = ""
+        if packed_schema:
+            # Swap the single-file schema _parse_poml appended for the packed one
+            if tpl.schema_prompt and system.endswith(tpl.schema_prompt):
+                system = system[:-len(tpl.schema_prompt)]
+            schema_prompt = f"\n\nJSON Schema:\n{json.dumps(packed_schema, indent=2)}"
+
+        packed_messages = [
+            {"role": "system", "content": system + PACKED_PROMPT_SUFFIX + schema_prompt},
+            {"role": "user", "content": "\n\n".join(blocks)}
+        ]
+
+        if resp_fmt.get("type") == "json_schema" and packed_schema:
+            resp_fmt = {"type": "json_schema", "json_schema": packed_schema}
+
+        return packed_messages, resp_fmt, lf_prompt, current_source
+
+    def _parse_packed_content(self, metadatas: List[FileMetadata], heuristic_results: List[ClassificationResult], content: str) -> List[ClassificationResult]:
+        # Files the model skipped or mis-indexed keep their heuristic result
+        results = list(heuristic_results)
+        for entry in LLMClassificationBatchResponse.model_validate_json(content).results:
+            if 0 <= entry.index < len(metadatas):
+                results[entry.index] = self._to_result(metadatas[entry.index], entry)
+        return results
+
+    async def _classify_async(self, metadatas: List[FileMetadata], samples: List[Optional[bytes]], heuristic_results: List[ClassificationResult]) -> List[ClassificationResult]:
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+        client = self.async_client_factory()
+
+        async def _one(metadata: FileMetadata, sample: Optional[bytes], heuristic_res: ClassificationResult) -> ClassificationResult:
+            async with semaphore:
+                try:
+                    logging.info("calling LLM for: %s", metadata.path)
+                    return await self._call_llm_async(client, metadata, sample, heuristic_res)
+                except Exception as e:
+                    Observability.track_event("LLM_Error", {"error": str(e)})
+                    return heuristic_res
+
+        async def _packed(group_metadatas, group_samples, group_heuristics) -> List[ClassificationResult]:
+            if len(group_metadatas) == 1:
+                return [await _one(group_metadatas[0], group_samples[0], group_heuristics[0])]
+            async with semaphore:
+                try:
+                    logging.info("calling LLM for %d files", len(group_metadatas))
+                    return await self._call_llm_packed_async(client, group_metadatas, group_samples, group_heuristics)
+                except Exception as e:
+                    Observability.track_event("LLM_Error", {"error": str(e)})
+                    return list(group_heuristics)
+
+        try:
+            chunks = await asyncio.gather(*[
+                _packed(*group) for group in self._groups(metadatas, samples, heuristic_results)
+            ])
+            return [r for chunk in chunks for r in chunk]
+        finally:
+            await client.close()
+
+    async def _call_llm_packed_async(self, client: "AsyncOpenAI", metadatas: List[FileMetadata], samples: List[Optional[bytes]], heuristic_results: List[ClassificationResult]) -> List[ClassificationResult]:
+        messages, resp_fmt, lf_prompt, current_source = self._build_packed_request(metadatas, samples, heuristic_results)
+
+        with Observability.generation(
+            name="OpenAI Classification",
+            model=Config.MODEL_NAME,
+            input=messages,
+            prompt=lf_prompt,
+            metadata={"prompt_source": current_source, "batched": True, "files": len(metadatas)}
+        ) as gen:
+            response = await client.chat.completions.create(
+                model=Config.MODEL_NAME,
+                messages=messages,
+                response_format=resp_fmt
+            )
+
+            content = response.choices[0].message.content
+            gen.update(output=content)
+
+        return self._parse_packed_content(metadatas, heuristic_results, content)
+
+    async def _call_llm_async(self, client: "AsyncOpenAI", metadata: FileMetadata, content_sample: Optional[bytes], heuristic_res: ClassificationResult) -> ClassificationResult:
+        messages, resp_fmt, lf_prompt, current_source = self._build_request(metadata, content_sample, heuristic_res)
+
         with Observability.generation(
             name="OpenAI Classification",
             model=Config.MODEL_NAME,
             input=messages,
             prompt=lf_prompt, # None if POML
-            metadata={"prompt_source": current_source}
+            metadata={"prompt_source": current_source, "batched": True}
         ) as gen:
-            response = self.client.chat.completions.create(
+            response = await client.chat.completions.create(
                 model=Config.MODEL_NAME,
                 messages=messages,
                 response_format=resp_fmt
             )
-            
-            import json
+
             content = response.choices[0].message.content
             gen.update(output=content)
-            data = json.loads(content)
-        
-        return ClassificationResult(
-            category=data.get("category", "Misc"),
-            confidence_score=data.get("confidence_score", 0.5),
-            requires_deep_scan=data.get("requires_deep_scan", False),
-            path=metadata.path,
-            reasoning=data.get("reasoning_summary")
+
+        return self._parse_content(metadata, content)
+
+    def _batch_request_line(self, custom_id: int, metadata: FileMetadata, sample: Optional[bytes], heuristic_res: ClassificationResult) -> bytes:
+        """One Batch API JSONL request line; custom_id maps the result back to the file."""
+        messages, resp_fmt, _, _ = self._build_request(metadata, sample, heuristic_res)
+        return json.dumps({
+            "custom_id": str(custom_id),
+            "method": "POST",
+            "url": self.BATCH_ENDPOINT,
+            "body": {"model": Config.MODEL_NAME, "messages": messages, "response_format": resp_fmt}
+        }).encode("utf-8") + b"\n"
+
+    def _submit_batch(self, payload: IO[bytes], count: int) -> str:
+        """
+        Submits the JSONL payload as one Batch API job and waits for it.
+        Returns the output file's text; raises BatchDeadlineExceeded (after cancelling the job)
+        once LLM_BATCH_MAX_WAIT_SECONDS have passed.
+        """
+        payload.seek(0)
+        input_file = self.client.files.create(file=("classify_batch.jsonl", payload), purpose="batch")
+        batch = self.client.batches.create(
+            input_file_id=input_file.id,
+            endpoint=self.BATCH_ENDPOINT,
+            completion_window="24h"
         )
+        Observability.track_event("LLM_Batch_Submitted", {"batch_id": batch.id, "files": count})
+
+        deadline = time.monotonic() + Config.LLM_BATCH_MAX_WAIT_SECONDS
+        while batch.status not in self.BATCH_TERMINAL_STATES:
+            if time.monotonic() >= deadline:
+                try:
+                    self.client.batches.cancel(batch.id)
+                except Exception as e:
+                    Observability.track_event("LLM_Batch_Error", {"error": str(e)})
+                raise BatchDeadlineExceeded(f"Batch {batch.id} not done after {Config.LLM_BATCH_MAX_WAIT_SECONDS:.0f}s; cancelled")
+            time.sleep(Config.LLM_BATCH_POLL_SECONDS)
+            batch = self.client.batches.retrieve(batch.id)
+
+        if batch.status != "completed" or not batch.output_file_id:
+            raise RuntimeError(f"Batch {batch.id} ended with status {batch.status}")
+        return self.client.files.content(batch.output_file_id).text
+
+    def _apply_batch_output(self, output: str, requests: Dict[int, FileMetadata], results: List[ClassificationResult]) -> None:
+        # Anything missing or malformed keeps its heuristic result
+        for line in output.splitlines():
+            if not line.strip():
+                continue
+            try:
+                record = json.loads(line)
+                i = int(record["custom_id"])
+                content = record["response"]["body"]["choices"][0]["message"]["content"]
+                results[i] = self._parse_content(requests[i], content)
+            except Exception as e:
+                Observability.track_event("LLM_Error", {"error": str(e)})
+
+    def _replay_online(self, payload: IO[bytes], requests: Dict[int, FileMetadata], results: List[ClassificationResult]) -> None:
+        """Sends the spooled Batch API request bodies as online requests, REPLAY_CHUNK_SIZE at a time."""
+        payload.seek(0)
+        records = (json.loads(line) for line in payload if line.strip())
+        while chunk := list(itertools.islice(records, self.REPLAY_CHUNK_SIZE)):
+            contents = self._run(self._send_bodies_async([record["body"] for record in chunk]))
+            for record, content in zip(chunk, contents):
+                if content is None:
+                    continue
+                i = int(record["custom_id"])
+                try:
+                    results[i] = self._parse_content(requests[i], content)
+                except Exception as e:
+                    Observability.track_event("LLM_Error", {"error": str(e)})
+
+    async def _send_bodies_async(self, bodies: List[dict]) -> List[Optional[str]]:
+        """Posts prepared chat request bodies concurrently; None for any request that failed."""
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+        client = self.async_client_factory()
+
+        async def _one(body: dict) -> Optional[str]:
+            async with semaphore:
+                try:
+                    with Observability.generation(
+                        name="OpenAI Classification",
+                        model=body["model"],
+                        input=body["messages"],
+                        metadata={"prompt_source": "batch_replay", "batched": True}
+                    ) as gen:
+                        response = await client.chat.completions.create(**body)
+                        content = response.choices[0].message.content
+                        gen.update(output=content)
+                    return content
+                except Exception as e:
+                    Observability.track_event("LLM_Error", {"error": str(e)})
+                    return None
+
+        try:
+            return await asyncio.gather(*[_one(body) for body in bodies])
+        finally:
+            await client.close()
+
+
+class _BatchAPIJob(ClassificationBatch):
+    """
+    One Batch API job for all chunks of a plan. add() writes each file's request line to a
+    temp file, so samples are dropped as chunks arrive; results() submits the file once.
+    If the job misses its deadline, the same request bodies are replayed online.
+    """
+    def __init__(self, classifier: BatchingLLMClassifier):
+        super().__init__(classifier)
+        self._payload = tempfile.TemporaryFile()
+        self._requests: Dict[int, FileMetadata] = {} # custom_id (position in results) -> file sent to the LLM
+
+    def add(self, metadatas: List[FileMetadata], samples: List[Optional[bytes]]) -> None:
+        classifier = self.classifier
+        # Heuristics run first and double as per-file fallbacks
+        for metadata, sample in zip(metadatas, samples):
+            heuristic_res = classifier.fallback.classify(metadata, sample)
+            if not classifier._heuristic_is_final(heuristic_res):
+                i = len(self._results)
+                self._payload.write(classifier._batch_request_line(i, metadata, sample, heuristic_res))
+                self._requests[i] = metadata
+            self._results.append(heuristic_res)
+
+    def results(self) -> List[ClassificationResult]:
+        classifier = self.classifier
+        try:
+            skipped = len(self._results) - len(self._requests)
+            if skipped:
+                Observability.track_event("LLM_Skipped", {"count": skipped, "total": len(self._results)})
+            if self._requests:
+                try:
+                    output = classifier._submit_batch(self._payload, len(self._requests))
+                    classifier._apply_batch_output(output, self._requests, self._results)
+                except BatchDeadlineExceeded as e:
+                    # Batch was cancelled after LLM_BATCH_MAX_WAIT_SECONDS; classify online instead
+                    Observability.track_event("LLM_Batch_Timeout", {"error": str(e)})
+                    classifier._replay_online(self._payload, self._requests, self._results)
+                except Exception as e:
+                    Observability.track_event("LLM_Batch_Error", {"error": str(e)})
+            return self._results
+        finally:
+            self._payload.close()
@@ -1,7 +1,11 @@
+import os
 import sqlite3
 import json
 import uuid
-from typing import Optional, List
+import threading
+from collections import OrderedDict
+from dataclasses import asdict
+from typing import Optional, List, Iterator, Tuple
 from pathlib import Path
 from datetime import datetime
 from contextlib import contextmanager
@@ -9,14 +13,37 @@ from contextlib import contextmanager
 from fastmcp_organizer.core.interfaces import IStorage, ExecutionPlan, PlanItem, ClassificationResult
 
 class SQLiteStorage(IStorage):
+    CLASSIFICATION_CACHE_SIZE = 100_000 # In-memory entries kept in front of file_cache
+    ITER_BATCH_SIZE = 500 # Rows fetched per lock acquisition in iter_plan_items
+    IDENTITY_CACHE_SIZE = 200_000 # In-memory entries kept in front of file_identity
+
     def __init__(self, db_path: str):
         self.db_path = db_path
         # Ensure directory exists
         Path(db_path).parent.mkdir(parents=True, exist_ok=True)
+        # One long-lived connection shared by all calls (SQLite allows a single writer anyway).
+        # Autocommit mode; transactions are issued explicitly in _get_conn.
+        self._conn = sqlite3.connect(db_path, check_same_thread=False, isolation_level=None)
+        self._conn.row_factory = sqlite3.Row
+        self._lock = threading.RLock()
+        # Bounded LRU of file_hash -> ClassificationResult; warm lookups skip SQL + JSON parsing
+        self._cls_cache: "OrderedDict[str, ClassificationResult]" = OrderedDict()
+        # Bounded LRU of path -> (size, mtime_ns, ClassificationResult) in front of file_identity
+        self._identities: "OrderedDict[str, Tuple[int, int, ClassificationResult]]" = OrderedDict()
         self._init_db()
 
     def _init_db(self):
-        with self._get_conn() as conn:
+        # Runs outside _get_conn: journal_mode can't change inside a transaction
+        # and executescript would implicitly commit it.
+        with self._lock:
+            conn = self._conn
+            # WAL is persistent on the database file; readers no longer block the writer
+            conn.execute("PRAGMA journal_mode=WAL")
+            # Safe with WAL (no fsync per commit, only at checkpoint)
+            conn.execute("PRAGMA synchronous=NORMAL")
+            # Keep a warm page cache (~64MB) across calls
+            conn.execute("PRAGMA cache_size=-64000")
+            conn.execute("PRAGMA temp_store=MEMORY")
             conn.executescript("""
                 CREATE TABLE IF NOT EXISTS file_cache (
                     file_hash TEXT PRIMARY KEY,
@@ -45,20 +72,46 @@ class SQLiteStorage(IStorage):
                     error_msg TEXT,
                     FOREIGN KEY(plan_id) REFERENCES plans(id)
                 );
+
+                -- Last seen (size, mtime_ns) per path; unchanged files are classified without being read
+                CREATE TABLE IF NOT EXISTS file_identity (
+                    path TEXT PRIMARY KEY,
+                    size INTEGER,
+                    mtime_ns INTEGER,
+                    hash TEXT,
+                    classification_json TEXT -- ClassificationResult
+                );
+
+                CREATE INDEX IF NOT EXISTS idx_plan_items_plan_id ON plan_items(plan_id);
+                CREATE INDEX IF NOT EXISTS idx_file_cache_path ON file_cache(file_path);
             """)
 
     @contextmanager
     def _get_conn(self):
-        conn = sqlite3.connect(self.db_path)
-        conn.row_factory = sqlite3.Row
-        try:
-            yield conn
-            conn.commit()
-        except Exception:
-            conn.rollback()
-            raise
-        finally:
-            conn.close()
+        with self._lock:
+            conn = self._conn
+            if conn.in_transaction:
+                # Nested use joins the outer transaction
+                yield conn
+                return
+            conn.execute("BEGIN")
+            try:
+                yield conn
+                conn.execute("COMMIT")
+            except BaseException:
+                # Also on KeyboardInterrupt, so the shared connection isn't left mid-transaction
+                conn.execute("ROLLBACK")
+                raise
+
+    @contextmanager
+    def transaction(self):
+        # Storage calls inside the block join this transaction (see _get_conn)
+        with self._get_conn():
+            yield
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
 
     def save_plan(self, plan: ExecutionPlan) -> None:
         with self._get_conn() as conn:
@@ -66,30 +119,22 @@ class SQLiteStorage(IStorage):
                 "INSERT INTO plans (id, root_dir, status, created_at) VALUES (?, ?, ?, ?)",
                 (plan.id, plan.root_dir, plan.status, plan.created_at.isoformat())
             )
-            for item in plan.items:
-                conn.execute(
-                    "INSERT INTO plan_items (id, plan_id, src_path, dest_path, reasoning, status, error_msg) VALUES (?, ?, ?, ?, ?, ?, ?)",
-                    (item.id, item.plan_id, item.src_path, item.dest_path, item.reasoning, item.status, item.error_msg)
-                )
+            rows = [
+                (item.id, item.plan_id, item.src_path, item.dest_path, item.reasoning, item.status, item.error_msg)
+                for item in plan.items
+            ]
+            conn.executemany(
+                "INSERT INTO plan_items (id, plan_id, src_path, dest_path, reasoning, status, error_msg) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                rows
+            )
 
-    def get_plan(self, plan_id: str) -> Optional[ExecutionPlan]:
+    def get_plan(self, plan_id: str, include_items: bool = True) -> Optional[ExecutionPlan]:
         with self._get_conn() as conn:
             row = conn.execute("SELECT * FROM plans WHERE id = ?", (plan_id,)).fetchone()
             if not row:
                 return None
             
-            items_rows = conn.execute("SELECT * FROM plan_items WHERE plan_id = ?", (plan_id,)).fetchall()
-            items = [
-                PlanItem(
-                    id=item['id'],
-                    plan_id=item['plan_id'],
-                    src_path=item['src_path'],
-                    dest_path=item['dest_path'],
-                    reasoning=item['reasoning'],
-                    status=item['status'],
-                    error_msg=item['error_msg']
-                ) for item in items_rows
-            ]
+            items = list(self.iter_plan_items(plan_id)) if include_items else []
             
             return ExecutionPlan(
                 id=row['id'],
@@ -99,6 +144,30 @@ class SQLiteStorage(IStorage):
                 items=items
             )
 
+    def iter_plan_items(self, plan_id: str) -> Iterator[PlanItem]:
+        # Stream from the cursor in batches; the lock is only held while fetching
+        with self._lock:
+            cursor = self._conn.execute("SELECT * FROM plan_items WHERE plan_id = ?", (plan_id,))
+        try:
+            while True:
+                with self._lock:
+                    rows = cursor.fetchmany(self.ITER_BATCH_SIZE)
+                if not rows:
+                    break
+                for item in rows:
+                    yield PlanItem(
+                        id=item['id'],
+                        plan_id=item['plan_id'],
+                        src_path=item['src_path'],
+                        dest_path=item['dest_path'],
+                        reasoning=item['reasoning'],
+                        status=item['status'],
+                        error_msg=item['error_msg']
+                    )
+        finally:
+            with self._lock:
+                cursor.close()
+
     def update_item_status(self, item_id: str, status: str, error_msg: Optional[str] = None) -> None:
         with self._get_conn() as conn:
             conn.execute(
@@ -106,22 +175,94 @@ class SQLiteStorage(IStorage):
                 (status, error_msg, item_id)
             )
 
+    def update_item_statuses(self, updates: List[Tuple[str, str, Optional[str]]]) -> None:
+        with self._get_conn() as conn:
+            conn.executemany(
+                "UPDATE plan_items SET status = ?, error_msg = ? WHERE id = ?",
+                [(status, error_msg, item_id) for item_id, status, error_msg in updates]
+            )
+
+    def _remember_identity(self, path: str, size: int, mtime_ns: int, result: ClassificationResult) -> None:
+        with self._lock:
+            self._identities[path] = (size, mtime_ns, result)
+            self._identities.move_to_end(path)
+            if len(self._identities) > self.IDENTITY_CACHE_SIZE:
+                self._identities.popitem(last=False)
+
+    def get_classification_by_identity(self, path: str, size: int, mtime_ns: int) -> Optional[ClassificationResult]:
+        with self._lock:
+            cached = self._identities.get(path)
+            if cached is not None and cached[0] == size and cached[1] == mtime_ns:
+                self._identities.move_to_end(path)
+                return cached[2]
+
+        with self._get_conn() as conn:
+            row = conn.execute(
+                "SELECT classification_json FROM file_identity WHERE path = ? AND size = ? AND mtime_ns = ?",
+                (path, size, mtime_ns)
+            ).fetchone()
+        if row:
+            result = ClassificationResult(**json.loads(row['classification_json']))
+            self._remember_identity(path, size, mtime_ns, result)
+            return result
+        return None
+
+    def upsert_identity(self, path: str, size: int, mtime_ns: int, file_hash: str, result: ClassificationResult) -> None:
+        with self._get_conn() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO file_identity (path, size, mtime_ns, hash, classification_json) VALUES (?, ?, ?, ?, ?)",
+                (path, size, mtime_ns, file_hash, json.dumps(asdict(result)))
+            )
+        self._remember_identity(path, size, mtime_ns, result)
+
+    def prune_identities(self, root: str, keep: List[str]) -> None:
+        prefix = root.rstrip(os.sep) + os.sep
+        keep_set = set(keep)
+        with self._get_conn() as conn:
+            # Anti-join against a temp table; NOT IN (?, ?, ...) would hit the bound-variable limit
+            conn.execute("CREATE TEMP TABLE IF NOT EXISTS seen_paths (path TEXT PRIMARY KEY)")
+            conn.execute("DELETE FROM seen_paths")
+            conn.executemany("INSERT OR IGNORE INTO seen_paths (path) VALUES (?)", ((p,) for p in keep_set))
+            conn.execute(
+                "DELETE FROM file_identity WHERE substr(path, 1, ?) = ? AND path NOT IN (SELECT path FROM seen_paths)",
+                (len(prefix), prefix)
+            )
+            conn.execute("DELETE FROM seen_paths")
+            stale = [p for p in self._identities if p.startswith(prefix) and p not in keep_set]
+            for path in stale:
+                del self._identities[path]
+
+    def _remember_classification(self, file_hash: str, result: ClassificationResult) -> None:
+        with self._lock:
+            self._cls_cache[file_hash] = result
+            self._cls_cache.move_to_end(file_hash)
+            if len(self._cls_cache) > self.CLASSIFICATION_CACHE_SIZE:
+                self._cls_cache.popitem(last=False)
+
     def get_cached_classification(self, file_hash: str) -> Optional[ClassificationResult]:
+        with self._lock:
+            cached = self._cls_cache.get(file_hash)
+            if cached is not None:
+                self._cls_cache.move_to_end(file_hash)
+                return cached
+
         with self._get_conn() as conn:
             row = conn.execute("SELECT metadata_json FROM file_cache WHERE file_hash = ?", (file_hash,)).fetchone()
-            if row:
-                data = json.loads(row['metadata_json'])
-                return ClassificationResult(**data)
+        if row:
+            result = ClassificationResult(**json.loads(row['metadata_json']))
+            self._remember_classification(file_hash, result)
+            return result
         return None
 
     def cache_classification(self, file_hash: str, result: ClassificationResult) -> None:
         with self._get_conn() as conn:
             conn.execute(
                 "INSERT OR REPLACE INTO file_cache (file_hash, file_path, size_bytes, mtime, metadata_json) VALUES (?, ?, ?, ?, ?)",
-                (file_hash, result.path, 0, 0, result.model_dump_json()) # We might want to pass size/mtime separately if we have them handy here, but the interface for cache_classification only takes result. I'll rely on the JSON blob for now or update interface if needed. Ideally, IScanner returns FileMetadata which has size/mtime.
+                (file_hash, result.path, 0, 0, json.dumps(asdict(result))) # We might want to pass size/mtime separately if we have them handy here, but the interface for cache_classification only takes result. I'll rely on the JSON blob for now or update interface if needed. Ideally, IScanner returns FileMetadata which has size/mtime.
                 # Correction: I should update cache_classification to take FileMetadata + ClassificationResult ? 
                 # For now, simplistic implementation. `size_bytes` and `mtime` in DB are for debugging mostly or re-hashing checks.
                 # Let's just put 0 placeholders or extracting from result if I added them to ClassificationResult (I didn't). 
                 # Actually, ClassificationResult has `path`.
                 # I'll stick to this for now.
             )
+        self._remember_classification(file_hash, result)
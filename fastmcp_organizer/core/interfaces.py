@@ -1,25 +1,31 @@
+import os
 from abc import ABC, abstractmethod
-from typing import Optional, List, Any, Dict
+from typing import Optional, List, Any, Dict, Iterator, Tuple, ContextManager
+from dataclasses import dataclass
 from pathlib import Path
 from pydantic import BaseModel
 from datetime import datetime
 
 # Domain Models (DTOs)
-class FileMetadata(BaseModel):
+# Per-file DTOs are slotted dataclasses: built once or twice per scanned file, so no
+# validation or per-instance __dict__. Pydantic stays at the boundaries (ExecutionPlan, LLM output).
+@dataclass(slots=True, frozen=True)
+class FileMetadata:
     path: str
     size_bytes: int
     mtime: float
     hash: str
-    content_sample: Optional[bytes] = None
 
-class ClassificationResult(BaseModel):
+@dataclass(slots=True, frozen=True)
+class ClassificationResult:
     category: str
     confidence_score: float
     requires_deep_scan: bool
     path: str
     reasoning: Optional[str] = None
 
-class PlanItem(BaseModel):
+@dataclass(slots=True, frozen=True)
+class PlanItem:
     id: str
     plan_id: str
     src_path: str
@@ -38,25 +44,60 @@ class ExecutionPlan(BaseModel):
 # Interfaces
 class IScanner(ABC):
     @abstractmethod
-    def scan_file(self, path: Path) -> FileMetadata:
-        """Calculates hash and basic metadata for a file."""
+    def scan_file(self, path: Path, stats: Optional[os.stat_result] = None) -> FileMetadata:
+        """Calculates hash and basic metadata for a file. stats can be passed to skip a stat."""
         pass
 
+    @abstractmethod
+    def scan_file_with_sample(self, path: Path, stats: Optional[os.stat_result] = None) -> Tuple[FileMetadata, bytes]:
+        """Like scan_file, but also returns the content sample that was hashed."""
+        pass
+
+class ClassificationBatch:
+    """
+    Collects files chunk by chunk and returns their classifications at the end. This default
+    classifies each chunk as it is added; classifiers that submit one job for the whole batch
+    return their own subclass from open_batch.
+    """
+    def __init__(self, classifier: "IClassifier"):
+        self.classifier = classifier
+        self._results: List[ClassificationResult] = []
+
+    def add(self, metadatas: List[FileMetadata], samples: List[Optional[bytes]]) -> None:
+        """Queues a chunk. The samples are not referenced after this call returns."""
+        self._results.extend(self.classifier.classify_many(metadatas, samples))
+
+    def results(self) -> List[ClassificationResult]:
+        """Classifications of every added file, in the order they were added."""
+        return self._results
+
 class IClassifier(ABC):
     @abstractmethod
-    def classify(self, metadata: FileMetadata, content_sample: Optional[str] = None) -> ClassificationResult:
+    def classify(self, metadata: FileMetadata, content_sample: Optional[bytes] = None) -> ClassificationResult:
         """Determines the category and confidence for a file."""
         pass
 
+    def classify_many(self, metadatas: List[FileMetadata], samples: List[Optional[bytes]]) -> List[ClassificationResult]:
+        """Classifies several files at once. Results keep input order."""
+        return [self.classify(m, s) for m, s in zip(metadatas, samples)]
+
+    def open_batch(self) -> ClassificationBatch:
+        """Starts a batch that files can be added to in chunks (see ClassificationBatch)."""
+        return ClassificationBatch(self)
+
 class ISafetyPolicy(ABC):
+    def set_root(self, root: Path) -> None:
+        """Announces the root that upcoming validate_path calls will use, so it can be resolved once."""
+        pass
+
     @abstractmethod
     def validate_path(self, root: Path, target: Path) -> bool:
         """Checks if a path is safe to access/move."""
         pass
     
     @abstractmethod
-    def validate_move(self, src: Path, dest: Path) -> None:
-        """Raises exception if move is unsafe."""
+    def validate_move(self, src: Path, dest: Path, src_stat: Optional[os.stat_result] = None) -> None:
+        """Raises exception if move is unsafe. src_stat (an lstat of src) can be passed to skip a syscall."""
         pass
 
 class IStorage(ABC):
@@ -66,14 +107,29 @@ class IStorage(ABC):
         pass
 
     @abstractmethod
-    def get_plan(self, plan_id: str) -> Optional[ExecutionPlan]:
-        """Retrieves a plan by ID."""
+    def get_plan(self, plan_id: str, include_items: bool = True) -> Optional[ExecutionPlan]:
+        """Retrieves a plan by ID. With include_items=False, items is left empty."""
+        pass
+
+    @abstractmethod
+    def iter_plan_items(self, plan_id: str) -> Iterator[PlanItem]:
+        """Yields the items of a plan one at a time."""
         pass
 
     @abstractmethod
     def update_item_status(self, item_id: str, status: str, error_msg: Optional[str] = None) -> None:
         """Updates the status of a specific plan item."""
         pass
+
+    @abstractmethod
+    def update_item_statuses(self, updates: List[Tuple[str, str, Optional[str]]]) -> None:
+        """Updates several plan items at once. Each update is (item_id, status, error_msg)."""
+        pass
+
+    @abstractmethod
+    def transaction(self) -> ContextManager[None]:
+        """Groups all writes made inside the block into a single commit."""
+        pass
         
     @abstractmethod
     def get_cached_classification(self, file_hash: str) -> Optional[ClassificationResult]:
@@ -84,3 +140,18 @@ class IStorage(ABC):
     def cache_classification(self, file_hash: str, result: ClassificationResult) -> None:
         """Caches a classification result."""
         pass
+
+    @abstractmethod
+    def get_classification_by_identity(self, path: str, size: int, mtime_ns: int) -> Optional[ClassificationResult]:
+        """Returns the classification of a file whose path, size and mtime are unchanged since it was last scanned."""
+        pass
+
+    @abstractmethod
+    def upsert_identity(self, path: str, size: int, mtime_ns: int, file_hash: str, result: ClassificationResult) -> None:
+        """Records a file's current (size, mtime), hash and classification."""
+        pass
+
+    @abstractmethod
+    def prune_identities(self, root: str, keep: List[str]) -> None:
+        """Drops recorded identities under root whose path is not in keep."""
+        pass
@@ -1,10 +1,31 @@
 import os
+import stat
 from pathlib import Path
+from typing import Optional, Tuple
 from fastmcp_organizer.core.interfaces import ISafetyPolicy
 
 class StrictSafetyPolicy(ISafetyPolicy):
     def __init__(self, allow_symlinks: bool = False):
         self.allow_symlinks = allow_symlinks
+        # (root, resolved root or None if missing), replaced as one object: the policy is
+        # shared across concurrent requests, so a reader never sees one root paired with another's resolution
+        self._resolved_root: Optional[Tuple[Path, Optional[Path]]] = None
+
+    def set_root(self, root: Path) -> None:
+        """Resolves root once for the whole plan instead of on every validate_path call."""
+        try:
+            real_root = root.resolve(strict=True)
+        except FileNotFoundError:
+            real_root = None
+        self._resolved_root = (root, real_root)
+
+    def _resolve_root(self, root: Path) -> Path:
+        resolved = self._resolved_root # Single read of the pair
+        if resolved is not None and resolved[0] == root:
+            if resolved[1] is None:
+                raise FileNotFoundError(root)
+            return resolved[1]
+        return root.resolve(strict=True)
 
     def validate_path(self, root: Path, target: Path) -> bool:
         """
@@ -12,7 +33,7 @@ class StrictSafetyPolicy(ISafetyPolicy):
         """
         try:
             # Resolve symlinks and relative paths
-            real_root = root.resolve(strict=True)
+            real_root = self._resolve_root(root)
             # Target might not exist yet (if it's a destination), so we resolve parent
             if target.exists():
                 real_target = target.resolve(strict=True)
@@ -29,8 +50,9 @@ class StrictSafetyPolicy(ISafetyPolicy):
         # Check if target is actually inside root
         return real_target.is_relative_to(real_root)
 
-    def validate_move(self, src: Path, dest: Path) -> None:
-        if os.path.islink(src):
+    def validate_move(self, src: Path, dest: Path, src_stat: Optional[os.stat_result] = None) -> None:
+        is_link = stat.S_ISLNK(src_stat.st_mode) if src_stat is not None else os.path.islink(src)
+        if is_link:
             if not self.allow_symlinks:
                 raise ValueError(f"Symlink movement blocked: {src}")
         
@@ -1,31 +1,33 @@
+from functools import cache
+
 from fastmcp_organizer.config import Config
 from fastmcp_organizer.core.db import SQLiteStorage
 from fastmcp_organizer.core.scanner import CompositeScanner
-from fastmcp_organizer.core.classifier import HeuristicClassifier, LLMClassifier
+from fastmcp_organizer.core.classifier import HeuristicClassifier, BatchingLLMClassifier
 from fastmcp_organizer.core.safety import StrictSafetyPolicy
 from fastmcp_organizer.server.service import OrganizerService
 
-class Context:
-    _service_instance = None
+@cache
+def get_service() -> OrganizerService:
+    """Builds the service on first call; later calls return the same instance."""
+    # Initialize Dependencies
+    storage = SQLiteStorage(Config.DB_PATH)
+    scanner = CompositeScanner()
+    
+    # Chain Classifiers
+    heuristic = HeuristicClassifier()
+    classifier = BatchingLLMClassifier(fallback_classifier=heuristic)
+    
+    safety = StrictSafetyPolicy(allow_symlinks=Config.ALLOW_SYMLINKS)
+    
+    # Inject
+    return OrganizerService(
+        scanner=scanner,
+        classifier=classifier,
+        storage=storage,
+        safety=safety
+    )
 
-    @classmethod
-    def get_service(cls) -> OrganizerService:
-        if cls._service_instance is None:
-            # Initialize Dependencies
-            storage = SQLiteStorage(Config.DB_PATH)
-            scanner = CompositeScanner()
-            
-            # Chain Classifiers
-            heuristic = HeuristicClassifier()
-            classifier = LLMClassifier(fallback_classifier=heuristic)
-            
-            safety = StrictSafetyPolicy(allow_symlinks=Config.ALLOW_SYMLINKS)
-            
-            # Inject
-            cls._service_instance = OrganizerService(
-                scanner=scanner,
-                classifier=classifier,
-                storage=storage,
-                safety=safety
-            )
-        return cls._service_instance
+class Context:
+    # Kept for existing callers; same cached instance as get_service()
+    get_service = staticmethod(get_service)
@@ -1,5 +1,5 @@
 from fastmcp import FastMCP
-from fastmcp_organizer.server.context import Context
+from fastmcp_organizer.server.context import get_service
 
 # Initialize FastMCP Server
 mcp = FastMCP("FileOrganizer")
@@ -10,7 +10,7 @@ def create_organization_plan(folder_path: str) -> str:
     Scans a folder, classifies files, and generates an execution plan.
     Returns the Plan ID. Call execute_plan with this ID to apply changes.
     """
-    service = Context.get_service()
+    service = get_service()
     try:
         plan_id = service.create_plan(folder_path)
         return f"Plan created successfully. ID: {plan_id}. Call execute_plan('{plan_id}') to proceed."
@@ -23,7 +23,7 @@ def execute_plan(plan_id: str) -> str:
     Executes a previously created plan safely.
     Skips items that are already done.
     """
-    service = Context.get_service()
+    service = get_service()
     try:
         results = service.execute_plan(plan_id)
         if not results:
@@ -1,17 +1,109 @@
+import os
+import stat
+import errno
 import uuid
 import shutil
+import tempfile
 import logging
-from typing import List, Optional
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, Executor
+from typing import List, Optional, Iterator, Iterable, Tuple, Dict, Callable, TypeVar
 from datetime import datetime, timezone
 from pathlib import Path
 
 from fastmcp_organizer.core.interfaces import (
     IScanner, IClassifier, IStorage, ISafetyPolicy,
-    ExecutionPlan, PlanItem, ClassificationResult
+    ExecutionPlan, PlanItem, ClassificationResult, FileMetadata
 )
 from fastmcp_organizer.utils.observability import Observability
+from fastmcp_organizer.config import Config
+
+def _walk_files(root: str) -> Iterator[str]:
+    """
+    Yields file paths under root, like Path.rglob("*") + is_file(), but via os.scandir:
+    DirEntry type checks come from the directory listing (d_type), so no extra stat per entry.
+    Symlinked directories are not descended into; unreadable directories are skipped.
+    """
+    stack = [root]
+    while stack:
+        try:
+            with os.scandir(stack.pop()) as it:
+                for entry in it:
+                    if entry.is_dir(follow_symlinks=False):
+                        stack.append(entry.path)
+                    elif entry.is_file():
+                        yield entry.path
+        except OSError:
+            continue
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+def _bounded_map(ex: Executor, fn: Callable[[T], R], items: Iterable[T], window: int) -> Iterator[R]:
+    """
+    Like ex.map (results in input order), but at most `window` calls are submitted and not yet
+    consumed, so finished results can't pile up ahead of a slower consumer.
+    """
+    in_flight = deque()
+    for item in items:
+        if len(in_flight) >= window:
+            yield in_flight.popleft().result()
+        in_flight.append(ex.submit(fn, item))
+    while in_flight:
+        yield in_flight.popleft().result()
+
+def _copy_replace(src: Path, dest: Path) -> None:
+    """
+    Copies src (data and metadata) like shutil.copy2, which already copies kernel-side where
+    the platform can (sendfile on Linux, fcopyfile on macOS). Data goes to a new temp file next
+    to dest which then replaces dest, so an existing dest is only ever overwritten by a complete
+    copy, and a failure only removes the temp file.
+    """
+    # mkstemp creates with O_EXCL: the only file this function can delete is its own
+    fd, tmp_name = tempfile.mkstemp(prefix=f".{dest.name}.", suffix=".part", dir=dest.parent)
+    os.close(fd)
+    try:
+        shutil.copy2(src, tmp_name)
+        os.replace(tmp_name, dest)
+    except BaseException:
+        try:
+            os.unlink(tmp_name)
+        except OSError:
+            pass
+        raise
+
+def _move(src: Path, dest: Path, dev_cache: Dict[Path, int], src_stat: Optional[os.stat_result] = None) -> None:
+    """
+    Moves src to dest with a plain rename (metadata-only) when both are on one filesystem,
+    copying with _copy_replace only when it crosses devices. dev_cache memoizes st_dev per directory.
+    src_stat is an lstat of src, if the caller has one.
+    """
+    def _dev(directory: Path) -> int:
+        dev = dev_cache.get(directory)
+        if dev is None:
+            dev = dev_cache[directory] = os.stat(directory).st_dev
+        return dev
+
+    if _dev(src.parent) == _dev(dest.parent):
+        try:
+            os.rename(src, dest)
+            return
+        except OSError as e:
+            # Same st_dev can still be EXDEV (e.g. across bind mounts)
+            if e.errno != errno.EXDEV:
+                raise
+    is_link = stat.S_ISLNK(src_stat.st_mode) if src_stat is not None else os.path.islink(src)
+    if is_link:
+        # shutil.move recreates the link itself rather than copying its target
+        shutil.move(str(src), str(dest))
+        return
+    _copy_replace(src, dest) # Leaves src untouched on failure
+    os.unlink(src)
 
 class OrganizerService:
+    STATUS_FLUSH_EVERY = 500 # Item status updates written per storage transaction during execute_plan
+    CLASSIFY_CHUNK_SIZE = 512 # Cache misses (and their samples) held before being added to the classification batch
+
     def __init__(
         self,
         scanner: IScanner,
@@ -33,35 +125,87 @@ class OrganizerService:
         plan_id = str(uuid.uuid4())
         items: List[PlanItem] = []
         
+        # Phase 1: Scan & check cache
         # Simple recursive scan
         # In production, might want to limit depth or safely walk
-        for file_path in root_path.rglob("*"):
-            if not file_path.is_file():
-                continue
-                
-            # 1. Scan & Hash
-            metadata = self.scanner.scan_file(file_path)
-            
-            # 2. Check Cache
-            classification = self.storage.get_cached_classification(metadata.hash)
-            if classification:
-                print(f"[INFO] Using cached classification for: {file_path.name}")
-                Observability.track_event("Cache Hit", {"path": str(file_path), "category": classification.category})
-            
-            # 3. Classify if needed
-            if not classification:
-                # Get content sample only if needed (already in metadata)
-                content_sample = None
-                if metadata.content_sample:
-                     try:
-                        content_sample = metadata.content_sample.decode('utf-8', errors='ignore')
-                     except:
-                        pass
-                
-                classification = self.classifier.classify(metadata, content_sample)
-                self.storage.cache_classification(metadata.hash, classification)
-            
-            # 4. Determine Destination
+        paths = [Path(p) for p in _walk_files(root_dir)]
+
+        scanned = [] # (file_path, classification or None)
+        # Cache misses go to one classification batch, added every CLASSIFY_CHUNK_SIZE files so
+        # samples don't accumulate; results come back once all chunks are in (one Batch API job)
+        batch = self.classifier.open_batch()
+        chunk_metadatas: List[FileMetadata] = []
+        chunk_samples: List[Optional[bytes]] = []
+        miss_indices: List[int] = []
+        miss_metadatas: List[FileMetadata] = []
+        scanned_metadatas: List[FileMetadata] = []
+        cache_hits = 0 # Reported once below instead of printing per file
+
+        with ThreadPoolExecutor(max_workers=Config.SCAN_WORKERS) as ex:
+            # 1. Stat everything; files unchanged since the last scan come straight from the identity index
+            all_stats = list(ex.map(os.stat, paths))
+            to_scan: List[Tuple[Path, os.stat_result]] = []
+            scan_indices: List[int] = []
+            with self.storage.transaction(): # One read transaction for all probes, not one per file
+                for file_path, stats in zip(paths, all_stats):
+                    classification = self.storage.get_classification_by_identity(str(file_path), stats.st_size, stats.st_mtime_ns)
+                    if classification:
+                        # Unchanged and already classified: no read or hash needed
+                        cache_hits += 1
+                        Observability.track_event("Cache Hit", {"path": str(file_path), "category": classification.category})
+                    else:
+                        scan_indices.append(len(scanned))
+                        to_scan.append((file_path, stats))
+                    scanned.append((file_path, classification))
+
+            # 2. Scan & Hash the rest (I/O-bound: sample reads release the GIL, so overlap them).
+            # Consumed as they complete, with a bounded number in flight, so only samples of
+            # pending cache misses are alive at any time.
+            scan_results = _bounded_map(
+                ex, lambda job: self.scanner.scan_file_with_sample(*job), to_scan, window=Config.SCAN_WORKERS * 4
+            )
+            for idx, (file_path, stats), (metadata, sample) in zip(scan_indices, to_scan, scan_results):
+                scanned_metadatas.append(metadata)
+                # 3. Check Cache
+                classification = self.storage.get_cached_classification(metadata.hash)
+                if classification:
+                    # The sample is not kept past this iteration
+                    cache_hits += 1
+                    Observability.track_event("Cache Hit", {"path": str(file_path), "category": classification.category})
+                    scanned[idx] = (file_path, classification)
+                else:
+                    # Raw bytes; classifiers decode only if they need text
+                    miss_indices.append(idx)
+                    miss_metadatas.append(metadata)
+                    chunk_metadatas.append(metadata)
+                    chunk_samples.append(sample)
+                    if len(chunk_metadatas) >= self.CLASSIFY_CHUNK_SIZE:
+                        batch.add(chunk_metadatas, chunk_samples)
+                        chunk_metadatas, chunk_samples = [], []
+
+        logging.info("Cache hits: %d/%d", cache_hits, len(scanned))
+
+        # 4. Classify the cache misses
+        if chunk_metadatas:
+            batch.add(chunk_metadatas, chunk_samples)
+        if miss_metadatas:
+            results = batch.results()
+            # One commit for all new cache entries instead of one per file
+            with self.storage.transaction():
+                for idx, metadata, classification in zip(miss_indices, miss_metadatas, results):
+                    self.storage.cache_classification(metadata.hash, classification)
+                    scanned[idx] = (scanned[idx][0], classification)
+
+        # Index every scanned file by (path, size, mtime_ns) so the next scan can skip reading it,
+        # and forget paths under this root that no longer exist (moved or deleted)
+        with self.storage.transaction():
+            for idx, (file_path, stats), metadata in zip(scan_indices, to_scan, scanned_metadatas):
+                self.storage.upsert_identity(str(file_path), stats.st_size, stats.st_mtime_ns, metadata.hash, scanned[idx][1])
+            self.storage.prune_identities(root_dir, [str(p) for p in paths])
+
+        # Build plan items
+        for file_path, classification in scanned:
+            # 5. Determine Destination
             if classification.category == "Keep_Current_Location":
                 continue # No move needed
                 
@@ -95,9 +239,13 @@ class OrganizerService:
         self.storage.save_plan(plan)
         return plan_id
 
-    def get_plan(self, plan_id: str) -> Optional[ExecutionPlan]:
+    def get_plan(self, plan_id: str, include_items: bool = True) -> Optional[ExecutionPlan]:
         """Retrieves a plan by ID."""
-        return self.storage.get_plan(plan_id)
+        return self.storage.get_plan(plan_id, include_items=include_items)
+
+    def iter_plan_items(self, plan_id: str) -> Iterator[PlanItem]:
+        """Streams plan items without materializing the whole plan."""
+        return self.storage.iter_plan_items(plan_id)
 
     def execute_plan(self, plan_id: str) -> List[str]:
         """
@@ -106,40 +254,62 @@ class OrganizerService:
         plan = self.storage.get_plan(plan_id)
         if not plan:
             raise ValueError(f"Plan {plan_id} not found")
+        root_path = Path(plan.root_dir)
+        self.safety.set_root(root_path) # Resolved once for any validate_path calls against this root
             
         results = []
-        
-        for item in plan.items:
-            if item.status == 'DONE':
-                results.append(f"Skipped {item.src_path} (Already Done)")
-                continue
-            
-            if item.status == 'SKIPPED':
-                continue
+        dev_cache: Dict[Path, int] = {}
+        created_dirs = set() # Destination dirs already ensured during this run
+        # (item_id, status, error_msg), flushed in chunks instead of one transaction per item
+        status_updates: List[Tuple[str, str, Optional[str]]] = []
 
-            try:
-                src = Path(item.src_path)
-                dest = Path(item.dest_path)
+        try:
+            for item in plan.items:
+                if item.status == 'DONE':
+                    results.append(f"Skipped {item.src_path} (Already Done)")
+                    continue
                 
-                # Check existencve
-                if not src.exists():
-                     self.storage.update_item_status(item.id, 'ERROR', "Source not found")
-                     continue
+                if item.status == 'SKIPPED':
+                    continue
 
-                # Safety Check
-                self.safety.validate_move(src, dest)
-                
-                # Create parent dirs
-                dest.parent.mkdir(parents=True, exist_ok=True)
-                
-                # Move
-                shutil.move(str(src), str(dest))
-                
-                self.storage.update_item_status(item.id, 'DONE')
-                results.append(f"Moved {src.name} to {dest.parent.name}")
-                
-            except Exception as e:
-                self.storage.update_item_status(item.id, 'ERROR', str(e))
-                results.append(f"Error moving {item.src_path}: {e}")
+                if len(status_updates) >= self.STATUS_FLUSH_EVERY:
+                    self.storage.update_item_statuses(status_updates)
+                    status_updates = []
+
+                try:
+                    src = Path(item.src_path)
+                    dest = Path(item.dest_path)
+                    
+                    # One lstat covers the existence, file type and symlink checks
+                    try:
+                        src_stat = os.lstat(src)
+                    except FileNotFoundError:
+                        status_updates.append((item.id, 'ERROR', "Source not found"))
+                        continue
+                    if not (stat.S_ISREG(src_stat.st_mode) or stat.S_ISLNK(src_stat.st_mode)):
+                        status_updates.append((item.id, 'ERROR', "Source is not a regular file"))
+                        continue
+
+                    # Safety Checks
+                    self.safety.validate_move(src, dest, src_stat=src_stat)
+                    
+                    # Create parent dirs (once per directory)
+                    if dest.parent not in created_dirs:
+                        dest.parent.mkdir(parents=True, exist_ok=True)
+                        created_dirs.add(dest.parent)
+                    
+                    # Move
+                    _move(src, dest, dev_cache, src_stat=src_stat)
+                    
+                    status_updates.append((item.id, 'DONE', None))
+                    results.append(f"Moved {src.name} to {dest.parent.name}")
+                    
+                except Exception as e:
+                    status_updates.append((item.id, 'ERROR', str(e)))
+                    results.append(f"Error moving {item.src_path}: {e}")
+        finally:
+            # Persist whatever completed, even if the loop is interrupted
+            if status_updates:
+                self.storage.update_item_statuses(status_updates)
                 
         return results
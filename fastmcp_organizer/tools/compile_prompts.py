@@ -0,0 +1,32 @@
+"""
+Build step: pre-parses classifier.poml into a plain Python module
+(fastmcp_organizer/prompts_compiled.py) so runtime skips XML/JSON parsing.
+
+Usage: python -m fastmcp_organizer.tools.compile_prompts
+"""
+from pathlib import Path
+from pprint import pformat
+
+from fastmcp_organizer.core.classifier import POML_PATH, COMPILED_PROMPTS_PATH, _parse_poml, _poml_digest
+
+HEADER = "# Generated by `python -m fastmcp_organizer.tools.compile_prompts` from prompts/classifier.poml. Do not edit.\n"
+
+def compile_prompts(poml_path: Path = POML_PATH, out_path: Path = COMPILED_PROMPTS_PATH) -> Path:
+    tpl = _parse_poml(str(poml_path), poml_path.stat().st_mtime_ns)
+    out_path.write_text(
+        HEADER
+        + f"SOURCE_SHA256 = {_poml_digest(poml_path.read_bytes())!r}\n"
+        + f"SYSTEM = {tpl.system!r}\n"
+        + f"USER = {tpl.user!r}\n"
+        + f"SCHEMA = {pformat(tpl.schema, sort_dicts=False)}\n"
+        + f"SCHEMA_PROMPT = {tpl.schema_prompt!r}\n",
+        encoding="utf-8"
+    )
+    return out_path
+
+def main():
+    out = compile_prompts()
+    print(f"[INFO] Wrote {out}")
+
+if __name__ == '__main__':
+    main()
@@ -1,26 +1,75 @@
+import time
+import atexit
 import logging
-from langfuse import Langfuse
+from typing import Dict
 from fastmcp_organizer.config import Config
 
+class _NoOpObservation:
+    """Stand-in for a span/generation when Langfuse is disabled. Also its own context manager."""
+    def update(self, *args, **kwargs): pass
+    def end(self, *args, **kwargs): pass
+    def __enter__(self): return self
+    def __exit__(self, *args): pass
+
+_NOOP_OBSERVATION = _NoOpObservation()
+_root_logger = logging.getLogger()
+
 class Observability:
     _langfuse = None
+    # Decided once at import; when False every call below returns before touching Langfuse
+    _ENABLED = bool(Config.LANGFUSE_PUBLIC_KEY)
+    PROMPT_CACHE_TTL_SECONDS = 300
+    PROMPT_RETRY_SECONDS = 60 # After a failed fetch, don't retry that prompt for this long
+    _prompt_failed_at: Dict[str, float] = {}
 
     @classmethod
     def get_client(cls):
-        if not cls._langfuse and Config.LANGFUSE_PUBLIC_KEY:
+        if not cls._ENABLED:
+            return None
+        if not cls._langfuse:
             try:
+                from langfuse import Langfuse # Heavy (OTel); only imported when configured
                 cls._langfuse = Langfuse(
                     public_key=Config.LANGFUSE_PUBLIC_KEY,
                     secret_key=Config.LANGFUSE_SECRET_KEY,
                     host=Config.LANGFUSE_HOST
                 )
+                # Export in the background; pending events are flushed once at process exit
+                atexit.register(Observability.flush)
             except Exception as e:
                 logging.warning(f"Failed to initialize Langfuse: {e}")
         return cls._langfuse
 
+    @staticmethod
+    def get_prompt(name: str):
+        """
+        Returns a managed Langfuse prompt. The SDK caches it for PROMPT_CACHE_TTL_SECONDS and
+        refreshes it after that, so edits in Langfuse reach long-running servers.
+        None if Langfuse is not configured or the prompt is unavailable; a failed fetch is
+        retried after PROMPT_RETRY_SECONDS rather than on every file.
+        """
+        client = Observability.get_client()
+        if not client:
+            return None
+        failed_at = Observability._prompt_failed_at.get(name)
+        if failed_at is not None and time.monotonic() - failed_at < Observability.PROMPT_RETRY_SECONDS:
+            return None
+        try:
+            prompt = client.get_prompt(name, cache_ttl_seconds=Observability.PROMPT_CACHE_TTL_SECONDS)
+        except Exception as e:
+            Observability._prompt_failed_at[name] = time.monotonic()
+            logging.warning(f"Langfuse prompt '{name}' unavailable: {e}")
+            return None
+        Observability._prompt_failed_at.pop(name, None)
+        return prompt
+
     @staticmethod
     def track_event(name: str, metadata: dict = None):
-        logging.info(f"EVENT: {name} | {metadata}")
+        # Called per cache hit / skipped file; nothing to do if neither Langfuse nor INFO logging is on
+        if not Observability._ENABLED and not _root_logger.isEnabledFor(logging.INFO):
+            return
+        # Lazy %-args: the metadata repr is only built if INFO is actually emitted
+        logging.info("EVENT: %s | %s", name, metadata)
         client = Observability.get_client()
         if client:
             try:
@@ -43,17 +92,13 @@ class Observability:
         client = Observability.get_client()
         if client:
             return client.start_as_current_span(name=name, **kwargs)
+        return _NOOP_OBSERVATION
+
     @staticmethod
     def generation(name: str, **kwargs):
         """Returns a context manager for a generation"""
         client = Observability.get_client()
         if client:
             return client.start_as_current_observation(name=name, as_type="generation", **kwargs)
-        # Mock object
-        class MockGen:
-             def update(self, *args, **kwargs): pass
-             def end(self, *args, **kwargs): pass
-             def __enter__(self): return self
-             def __exit__(self, *args): pass
-        return MockGen()
+        return _NOOP_OBSERVATION
 
@@ -1,10 +1,40 @@
 import pytest
 import os
+import sys
+import json
+import errno
+import runpy
+import asyncio
+from datetime import datetime, timezone
 from pathlib import Path
+from types import SimpleNamespace, ModuleType
+from fastmcp_organizer.config import Config
 from fastmcp_organizer.core.safety import StrictSafetyPolicy
 from fastmcp_organizer.core.scanner import CompositeScanner
-from fastmcp_organizer.core.classifier import HeuristicClassifier
-from fastmcp_organizer.core.interfaces import FileMetadata
+from fastmcp_organizer.core.reader import FileReader
+from fastmcp_organizer.core.classifier import HeuristicClassifier, BatchingLLMClassifier, POML_PATH, _load_poml, _parse_poml, _poml_digest, _compiled_poml
+from fastmcp_organizer.core.interfaces import FileMetadata, ExecutionPlan, PlanItem
+from fastmcp_organizer.core.db import SQLiteStorage
+from fastmcp_organizer.server.service import OrganizerService, _move
+from fastmcp_organizer.tools.compile_prompts import compile_prompts
+from fastmcp_organizer.utils.observability import Observability
+
+def _chat_response(content: str):
+    """Minimal stand-in for an OpenAI chat completion carrying one message."""
+    return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=content))])
+
+def _classification_json(category: str) -> str:
+    return json.dumps({"category": category, "confidence_score": 0.7, "requires_deep_scan": False})
+
+def _fake_async_client(create):
+    """AsyncOpenAI stand-in factory whose chat.completions.create is the given coroutine function."""
+    class FakeAsyncClient:
+        chat = SimpleNamespace(completions=SimpleNamespace(create=create))
+
+        async def close(self):
+            pass
+
+    return FakeAsyncClient
 
 def test_safety_policy(tmp_path):
     policy = StrictSafetyPolicy(allow_symlinks=False)
@@ -22,6 +52,11 @@ def test_safety_policy(tmp_path):
     assert policy.validate_path(root, target) is True
     assert policy.validate_path(root, Path("/etc/passwd")) is False
 
+    # Cached root gives the same answers
+    policy.set_root(root)
+    assert policy.validate_path(root, target) is True
+    assert policy.validate_path(root, Path("/etc/passwd")) is False
+
 def test_classifier():
     classifier = HeuristicClassifier()
     
@@ -37,7 +72,7 @@ def test_classifier():
 
     # Test Content Classification
     meta_txt = FileMetadata(path="invoice.txt", size_bytes=100, mtime=0, hash="abc")
-    res_txt = classifier.classify(meta_txt, content_sample="Total: $500")
+    res_txt = classifier.classify(meta_txt, content_sample=b"Total: $500")
     assert res_txt.category == "Financial"
 
 def test_scanner_integrity(tmp_path):
@@ -45,8 +80,351 @@ def test_scanner_integrity(tmp_path):
     f = tmp_path / "test.txt"
     f.write_text("Hello World" * 1000)
     
-    meta1 = scanner.scan_file(f)
+    meta1, sample = scanner.scan_file_with_sample(f)
     meta2 = scanner.scan_file(f)
     
     assert meta1.hash == meta2.hash
+    assert meta1.hash.split(":")[0] in ("b3", "b2") # Algorithm is part of the key
     assert meta1.size_bytes == f.stat().st_size
+
+def test_create_plan_batches_cache_misses(tmp_path):
+    class RecordingClassifier(HeuristicClassifier):
+        def __init__(self):
+            self.batches = []
+
+        def classify_many(self, metadatas, samples):
+            self.batches.append([m.path for m in metadatas])
+            return super().classify_many(metadatas, samples)
+
+    root = tmp_path / "root"
+    root.mkdir()
+    (root / "a.png").write_bytes(b"png")
+    (root / "b.txt").write_text("Total: $5")
+
+    classifier = RecordingClassifier()
+    service = OrganizerService(
+        scanner=CompositeScanner(),
+        classifier=classifier,
+        storage=SQLiteStorage(str(tmp_path / "state.db")),
+        safety=StrictSafetyPolicy()
+    )
+
+    plan = service.get_plan(service.create_plan(str(root)))
+    assert len(classifier.batches) == 1
+    assert sorted(Path(p).name for p in classifier.batches[0]) == ["a.png", "b.txt"]
+    dests = {Path(i.src_path).name: Path(i.dest_path).parent.name for i in plan.items}
+    assert dests == {"a.png": "Images", "b.txt": "Financial"}
+
+    # Cache misses are classified in bounded chunks
+    chunked = OrganizerService(
+        scanner=CompositeScanner(),
+        classifier=RecordingClassifier(),
+        storage=SQLiteStorage(str(tmp_path / "chunked.db")),
+        safety=StrictSafetyPolicy()
+    )
+    chunked.CLASSIFY_CHUNK_SIZE = 1
+    chunked_plan = chunked.get_plan(chunked.create_plan(str(root)))
+    assert len(chunked.classifier.batches) == 2
+    assert {Path(i.src_path).name: Path(i.dest_path).parent.name for i in chunked_plan.items} == dests
+
+    # Second scan is served from cache; nothing left to classify, and unchanged files aren't re-read
+    scanned = []
+    real_scan = service.scanner.scan_file_with_sample
+    service.scanner.scan_file_with_sample = lambda p, stats=None: scanned.append(p) or real_scan(p, stats)
+    service.create_plan(str(root))
+    assert len(classifier.batches) == 1
+    assert scanned == []
+
+    # Identities of files that disappeared from the root are pruned
+    (root / "a.png").rename(tmp_path / "a.png")
+    service.create_plan(str(root))
+    assert service.storage.get_classification_by_identity(str(root / "a.png"), 3, (tmp_path / "a.png").stat().st_mtime_ns) is None
+    (tmp_path / "a.png").rename(root / "a.png")
+
+    # A modified file falls through to the hash path again
+    (root / "b.txt").write_text("Total: $6")
+    os.utime(root / "b.txt", ns=(0, 10**9))
+    service.create_plan(str(root))
+    assert sorted(p.name for p in scanned) == ["a.png", "b.txt"] # a.png's identity was pruned above
+
+def test_batching_llm_classifier_keeps_order():
+    calls = []
+
+    async def create(model, messages, response_format):
+        calls.append(messages)
+        # Finish later requests first to prove results are re-ordered
+        user = messages[-1]["content"]
+        await asyncio.sleep(0.01 if "first" in user else 0)
+        return _chat_response(_classification_json("First" if "first" in user else "Second"))
+
+    classifier = BatchingLLMClassifier(HeuristicClassifier(), max_concurrency=2, use_batch_api=False)
+    classifier.client = object()
+    classifier.async_client_factory = _fake_async_client(create)
+
+    metas = [
+        FileMetadata(path="first.txt", size_bytes=1, mtime=0, hash="1"),
+        FileMetadata(path="photo.png", size_bytes=1, mtime=0, hash="3"),
+        FileMetadata(path="second.txt", size_bytes=1, mtime=0, hash="2"),
+    ]
+    results = classifier.classify_many(metas, [None, None, None])
+    assert [r.category for r in results] == ["First", "Images", "Second"]
+    assert [r.path for r in results] == ["first.txt", "photo.png", "second.txt"]
+    # Confident heuristic result (image) never reaches the LLM
+    assert len(calls) == 2
+
+def test_llm_client_built_on_first_use(monkeypatch):
+    built = []
+    monkeypatch.setattr("fastmcp_organizer.core.classifier._shared_openai_client", lambda: built.append(1))
+
+    classifier = BatchingLLMClassifier(HeuristicClassifier(), use_batch_api=False)
+    assert built == [] # Building the service (show/execute) doesn't create a client
+    classifier.classify_many([FileMetadata(path="a.txt", size_bytes=1, mtime=0, hash="1")], [None])
+    classifier.classify_many([FileMetadata(path="b.txt", size_bytes=1, mtime=0, hash="2")], [None])
+    assert built == [1]
+
+def test_batch_api_deadline_cancels_and_classifies_online(monkeypatch):
+    cancelled = []
+    batches = SimpleNamespace(
+        create=lambda **kw: SimpleNamespace(id="b1", status="in_progress"),
+        retrieve=lambda batch_id: SimpleNamespace(id=batch_id, status="in_progress"),
+        cancel=cancelled.append,
+    )
+    sync_client = SimpleNamespace(files=SimpleNamespace(create=lambda **kw: SimpleNamespace(id="f1")), batches=batches)
+
+    async def create(model, messages, response_format):
+        return _chat_response(_classification_json("Online"))
+
+    monkeypatch.setattr(Config, "LLM_PROVIDER", "openai")
+    monkeypatch.setattr(Config, "LLM_BATCH_MAX_WAIT_SECONDS", 0)
+    classifier = BatchingLLMClassifier(HeuristicClassifier(), use_batch_api=True)
+    classifier.client = sync_client
+    classifier.async_client_factory = _fake_async_client(create)
+
+    results = classifier.classify_many([FileMetadata(path="a.txt", size_bytes=1, mtime=0, hash="1")], [None])
+    assert cancelled == ["b1"]
+    assert [r.category for r in results] == ["Online"]
+
+def test_batch_api_submits_one_job_for_all_chunks(tmp_path, monkeypatch):
+    submitted = []
+
+    def create_file(file, purpose):
+        name, payload = file
+        submitted.append([json.loads(line) for line in payload])
+        return SimpleNamespace(id="f1")
+
+    def output():
+        lines = []
+        for request in submitted[-1]:
+            name = Path(request["body"]["messages"][-1]["content"].split("Filename: ")[-1].split()[0]).stem
+            body = {"choices": [{"message": {"content": _classification_json(f"C{name}")}}]}
+            lines.append(json.dumps({"custom_id": request["custom_id"], "response": {"body": body}}))
+        return SimpleNamespace(text="\n".join(lines))
+
+    sync_client = SimpleNamespace(
+        files=SimpleNamespace(create=create_file, content=lambda file_id: output()),
+        batches=SimpleNamespace(create=lambda **kw: SimpleNamespace(id="b1", status="completed", output_file_id="o1")),
+    )
+
+    monkeypatch.setattr(Config, "LLM_PROVIDER", "openai")
+    classifier = BatchingLLMClassifier(HeuristicClassifier(), use_batch_api=True)
+    classifier.client = sync_client
+
+    root = tmp_path / "root"
+    root.mkdir()
+    for i in range(5):
+        (root / f"{i}.txt").write_text(f"notes {i}")
+    service = OrganizerService(
+        scanner=CompositeScanner(),
+        classifier=classifier,
+        storage=SQLiteStorage(str(tmp_path / "state.db")),
+        safety=StrictSafetyPolicy()
+    )
+    service.CLASSIFY_CHUNK_SIZE = 2
+
+    plan = service.get_plan(service.create_plan(str(root)))
+    assert [len(job) for job in submitted] == [5]
+    assert {Path(i.src_path).stem: Path(i.dest_path).parent.name for i in plan.items} == {str(i): f"C{i}" for i in range(5)}
+
+def test_batching_llm_classifier_packs_files_per_prompt():
+    prompts = []
+
+    async def create(model, messages, response_format):
+        prompts.append(messages)
+        count = messages[-1]["content"].count("### File ")
+        # Answer out of order; the last file is left out on purpose
+        results = [{"index": i, "category": f"C{i}", "confidence_score": 0.7, "requires_deep_scan": False} for i in reversed(range(count - 1))]
+        return _chat_response(json.dumps({"results": results}))
+
+    classifier = BatchingLLMClassifier(HeuristicClassifier(), use_batch_api=False, files_per_prompt=3)
+    classifier.client = object()
+    classifier.async_client_factory = _fake_async_client(create)
+
+    metas = [FileMetadata(path=f"f{i}.txt", size_bytes=1, mtime=0, hash=str(i)) for i in range(5)]
+    results = classifier.classify_many(metas, [None] * 5)
+    assert len(prompts) == 2 # 3 + 2 files
+    # Only the packed schema is described, not the single-file one as well
+    system = prompts[0][0]["content"]
+    assert system.count("JSON Schema:") == 1 and '"results"' in system
+    assert [r.category for r in results] == ["C0", "C1", "Misc", "C0", "Misc"]
+    assert [r.path for r in results] == [m.path for m in metas]
+
+def test_poml_template_cached_until_modified(tmp_path):
+    tpl = _load_poml(POML_PATH)
+    assert tpl is _load_poml(POML_PATH)
+    assert tpl.schema["name"] == "FileClassificationResult"
+    assert "JSON Schema:" in tpl.schema_prompt
+
+    poml = tmp_path / "p.poml"
+    poml.write_text("<poml><system-msg>A</system-msg><human-msg>B</human-msg><output-schema></output-schema></poml>")
+    assert _load_poml(poml).system == "A"
+    poml.write_text("<poml><system-msg>C</system-msg><human-msg>B</human-msg><output-schema></output-schema></poml>")
+    os.utime(poml, ns=(0, 10**9))
+    assert _load_poml(poml).system == "C"
+
+def test_storage_roundtrip_and_rollback(tmp_path):
+    storage = SQLiteStorage(str(tmp_path / "state.db"))
+    item = PlanItem(id="i1", plan_id="p1", src_path="/r/a.txt", dest_path="/r/Misc/a.txt", reasoning="r", status="PENDING")
+    storage.save_plan(ExecutionPlan(id="p1", root_dir="/r", status="CREATED", created_at=datetime.now(timezone.utc), items=[item]))
+
+    assert [i.id for i in storage.iter_plan_items("p1")] == ["i1"]
+    assert storage.get_plan("p1", include_items=False).items == []
+
+    storage.update_item_status("i1", "DONE")
+    assert storage.get_plan("p1").items[0].status == "DONE"
+
+    # A failing transaction leaves no partial writes behind
+    with pytest.raises(RuntimeError):
+        with storage._get_conn() as conn:
+            conn.execute("UPDATE plan_items SET status = 'ERROR' WHERE id = 'i1'")
+            raise RuntimeError("boom")
+    assert storage.get_plan("p1").items[0].status == "DONE"
+
+    # Calls inside transaction() share one commit, and roll back together
+    with pytest.raises(RuntimeError):
+        with storage.transaction():
+            storage.update_item_status("i1", "ERROR")
+            storage.update_item_statuses([("i1", "SKIPPED", None)])
+            raise RuntimeError("boom")
+    assert storage.get_plan("p1").items[0].status == "DONE"
+
+def test_compile_prompts_matches_poml(tmp_path, monkeypatch):
+    out = compile_prompts(out_path=tmp_path / "prompts_compiled.py")
+    compiled = runpy.run_path(str(out))
+    tpl = _parse_poml(str(POML_PATH), POML_PATH.stat().st_mtime_ns)
+    assert compiled["SOURCE_SHA256"] == _poml_digest(POML_PATH.read_bytes())
+    assert (compiled["SYSTEM"], compiled["USER"], compiled["SCHEMA"], compiled["SCHEMA_PROMPT"]) == \
+        (tpl.system, tpl.user, tpl.schema, tpl.schema_prompt)
+
+    # Matched by content, so a checkout or install that changes the POML's mtime keeps it in use
+    module = ModuleType("fastmcp_organizer.prompts_compiled")
+    module.__dict__.update({k: v for k, v in compiled.items() if k.isupper()}, SYSTEM="compiled")
+    monkeypatch.setitem(sys.modules, "fastmcp_organizer.prompts_compiled", module)
+    _compiled_poml.cache_clear()
+    try:
+        assert _compiled_poml(POML_PATH.stat().st_mtime_ns + 1).system == "compiled"
+        module.SOURCE_SHA256 = "stale"
+        _compiled_poml.cache_clear()
+        assert _compiled_poml(POML_PATH.stat().st_mtime_ns) is None
+    finally:
+        _compiled_poml.cache_clear()
+
+def test_observability_noop_when_disabled(monkeypatch):
+    monkeypatch.setattr(Config, "LANGFUSE_PUBLIC_KEY", None)
+    monkeypatch.setattr(Observability, "_ENABLED", False)
+    monkeypatch.setattr(Observability, "_langfuse", None)
+
+    trace = Observability.trace("t", metadata={})
+    gen = Observability.generation("g", model="m")
+    assert trace is gen # Shared singleton, nothing allocated per call
+    with gen as g:
+        g.update(output="x")
+
+def test_get_prompt_retries_after_failure(monkeypatch):
+    class FlakyClient:
+        calls = 0
+
+        def get_prompt(self, name, cache_ttl_seconds):
+            FlakyClient.calls += 1
+            if FlakyClient.calls == 1:
+                raise RuntimeError("timeout")
+            return "prompt"
+
+    now = [1000.0]
+    monkeypatch.setattr(Observability, "get_client", classmethod(lambda cls: FlakyClient()))
+    monkeypatch.setattr(Observability, "_prompt_failed_at", {})
+    monkeypatch.setattr("fastmcp_organizer.utils.observability.time.monotonic", lambda: now[0])
+
+    assert Observability.get_prompt("p") is None
+    assert Observability.get_prompt("p") is None # Within the retry window: no new fetch
+    assert FlakyClient.calls == 1
+    now[0] += Observability.PROMPT_RETRY_SECONDS
+    assert Observability.get_prompt("p") == "prompt"
+
+def test_execute_plan_moves_and_records_status(tmp_path):
+    root = tmp_path / "root"
+    root.mkdir()
+    (root / "a.png").write_bytes(b"png")
+    (root / "gone.png").write_bytes(b"png")
+
+    service = OrganizerService(
+        scanner=CompositeScanner(),
+        classifier=HeuristicClassifier(),
+        storage=SQLiteStorage(str(tmp_path / "state.db")),
+        safety=StrictSafetyPolicy()
+    )
+    service.STATUS_FLUSH_EVERY = 1 # Exercise intermediate flushes
+    plan_id = service.create_plan(str(root))
+    (root / "gone.png").unlink()
+
+    service.execute_plan(plan_id)
+    statuses = {Path(i.src_path).name: i.status for i in service.get_plan(plan_id).items}
+    assert statuses == {"a.png": "DONE", "gone.png": "ERROR"}
+    assert (root / "Images" / "a.png").exists()
+
+def test_read_sample_head_and_tail(tmp_path):
+    big = tmp_path / "big.bin"
+    data = os.urandom(FileReader.HEAD_SIZE + FileReader.TAIL_SIZE + 100)
+    big.write_bytes(data)
+    assert FileReader.read_sample(big) == data[:FileReader.HEAD_SIZE] + data[-FileReader.TAIL_SIZE:]
+
+    small = tmp_path / "small.txt"
+    small.write_bytes(b"tiny")
+    assert FileReader.read_sample(small) == b"tiny"
+    assert FileReader.read_sample(tmp_path / "missing") == b""
+
+def test_move_falls_back_to_copy_across_devices(tmp_path, monkeypatch):
+    def cross_device(src, dest):
+        raise OSError(errno.EXDEV, "Invalid cross-device link")
+
+    src = tmp_path / "a.bin"
+    src.write_bytes(b"x" * 100_000)
+    (tmp_path / "dst").mkdir()
+    monkeypatch.setattr(os, "rename", cross_device)
+    _move(src, tmp_path / "dst" / "a.bin", {})
+
+    assert not src.exists()
+    assert (tmp_path / "dst" / "a.bin").read_bytes() == b"x" * 100_000
+
+    # A failed copy leaves both an existing destination and the source alone
+    src.write_bytes(b"new")
+    real_open = open
+
+    def unreadable_src(f, *args, **kwargs):
+        if f == src:
+            raise PermissionError(f)
+        return real_open(f, *args, **kwargs)
+
+    monkeypatch.setattr("builtins.open", unreadable_src)
+    with pytest.raises(PermissionError):
+        _move(src, tmp_path / "dst" / "a.bin", {})
+    monkeypatch.undo()
+    assert src.read_bytes() == b"new"
+    assert (tmp_path / "dst" / "a.bin").read_bytes() == b"x" * 100_000
+    assert sorted(p.name for p in (tmp_path / "dst").iterdir()) == ["a.bin"]
+
+    # Symlinks are moved as links, not as copies of their target
+    monkeypatch.setattr(os, "rename", cross_device)
+    link = tmp_path / "link.bin"
+    link.symlink_to(src)
+    _move(link, tmp_path / "dst" / "link.bin", {})
+    assert (tmp_path / "dst" / "link.bin").is_symlink()